@@ -0,0 +1,175 @@
+"""Compara los backends ordenados (AVL, arreglo ordenado, B-tree) con la mezcla
+de consultas del menú: búsquedas por métrica, umbrales, top-k, consultas por
+año y alguna edición ocasional. Con --shards N mide además cómo escala el modo
+repartido en procesos (ShardedTree) de 1 a N shards.
+
+Uso: python benchmark.py [--scale N] [--repeat R] [--backends avl,sorted,btree] [--shards N]
+"""
+import argparse
+import random
+import time
+
+from main import BACKENDS, CSV_PATH
+from src.dataset import load_dataset, to_payload, build_series_store
+from src.sharded import ShardedTree
+
+
+def _rows(csv_path: str, scale: int):
+    df, _, _ = load_dataset(csv_path)
+    store = build_series_store(df)
+    base = [to_payload(row, store) for _, row in df.iterrows()]
+    rnd = random.Random(0)
+    rows = []
+    for copy in range(scale):
+        for p in base:
+            payload = p if copy == 0 else dict(p, ISO3=f"{p['ISO3']}{copy}")
+            key = round(p["mean_change"], 6) if copy == 0 else round(p["mean_change"] + rnd.uniform(-0.05, 0.05), 6)
+            rows.append((key, payload))
+    return rows, store
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def _uncached(tree, fn):
+    # las consultas del menú están cacheadas por versión; se mide el cálculo real
+    def timed():
+        tree._query_cache.clear()
+        fn()
+    return timed
+
+
+def run(backends, scale: int, repeat: int):
+    rows, store = _rows(CSV_PATH, scale)
+    rnd = random.Random(1)
+    keys = [k for k, _ in rows]
+    lo, hi = min(keys), max(keys)
+    probes = [rnd.uniform(lo, hi) for _ in range(2000)]
+    thresholds = [rnd.uniform(lo, hi) for _ in range(50)]
+    years = list(range(1961, 2023, 3))
+    edits = rnd.sample(rows, max(1, len(rows) // 50))
+
+    results = {}
+    for name in backends:
+        if name == "sharded":
+            continue
+        cls = BACKENDS[name]
+
+        def build():
+            t = cls()
+            t.series_store = store
+            t.insert_batch(rows)
+            return t
+
+        tree = build()
+        stored = [n.key for n in tree.iter_inorder()]
+
+        def lookups():
+            for k in stored:
+                tree.find_by_key(k)
+            for v in probes:
+                tree.find_nearest(v)
+
+        def ranges():
+            for v in thresholds:
+                tree.punto_4c(v)
+            for v in probes[:200]:
+                list(tree.iter_range(v, v + 0.01))
+
+        def top():
+            for _ in range(200):
+                tree.top_k(10)
+                tree.bottom_k(10)
+
+        def yearly():
+            for y in years:
+                tree.punto_4a(y)
+                tree.punto_4b(y)
+
+        def edit():
+            for k, _ in edits:
+                n = tree.find_nearest(k)
+                key, payload = n.key, n.data
+                tree.delete(key)
+                tree.insert(key, payload)
+
+        tree.year_index(years[0])
+        results[name] = {
+            "build": _time(build, repeat),
+            "lookups": _time(lookups, repeat),
+            "ranges": _time(_uncached(tree, ranges), repeat),
+            "top_k": _time(top, repeat),
+            "yearly": _time(_uncached(tree, yearly), repeat),
+            "edits": _time(edit, repeat),
+        }
+    return len(rows), results
+
+
+def run_sharded(max_shards: int, scale: int, repeat: int):
+    rows, _ = _rows(CSV_PATH, scale)
+    rnd = random.Random(2)
+    keys = [k for k, _ in rows]
+    thresholds = [rnd.uniform(min(keys), max(keys)) for _ in range(20)]
+    years = list(range(1961, 2023, 3))
+
+    results = {}
+    for n in range(1, max_shards + 1):
+        tree = ShardedTree(n)
+        try:
+            def build():
+                tree.clear()
+                tree.boundaries = None
+                tree.insert_batch(rows)
+
+            build_ms = _time(build, repeat)
+
+            def scans():
+                for y in years:
+                    tree.punto_4a(y)
+                    tree.punto_4b(y)
+                for v in thresholds:
+                    tree.punto_4c(v)
+
+            results[n] = {"build": build_ms, "scans": _time(_uncached(tree, scans), repeat)}
+        finally:
+            tree.close()
+    return len(rows), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1, help="copias (con ruido en la clave) del dataset")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", default=",".join(b for b in BACKENDS if b != "sharded"))
+    parser.add_argument("--shards", type=int, default=0, help="medir ShardedTree con 1..N procesos")
+    args = parser.parse_args()
+
+    names = [b.strip() for b in args.backends.split(",") if b.strip()]
+    n, results = run(names, args.scale, args.repeat)
+
+    cols = list(next(iter(results.values())))
+    print(f"n = {n} filas, mejor de {args.repeat} (ms)")
+    print(f"{'backend':<8}" + "".join(f"{c:>10}" for c in cols) + f"{'total':>10}")
+    for name, r in results.items():
+        print(f"{name:<8}" + "".join(f"{r[c]:>10.2f}" for c in cols) + f"{sum(r.values()):>10.2f}")
+    # la construcción ocurre una sola vez por sesión; se elige por la mezcla de consultas
+    best = min(results, key=lambda b: sum(v for c, v in results[b].items() if c != "build"))
+    print(f"\nBackend recomendado para esta mezcla: {best}")
+
+    if args.shards > 0:
+        n, sharded = run_sharded(args.shards, args.scale, args.repeat)
+        base = sharded[1]
+        print(f"\nShardedTree, n = {n} filas, mejor de {args.repeat} (ms)")
+        print(f"{'shards':<8}{'build':>10}{'scans':>10}{'speedup':>10}")
+        for k, r in sharded.items():
+            print(f"{k:<8}{r['build']:>10.2f}{r['scans']:>10.2f}{base['scans'] / r['scans']:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,53 @@
+import sys
+
 from src.dataset import (
-    load_dataset, to_payload
+    load_dataset, to_payload, build_series_store, load_derived
 )
-from src.avl_tree import AVLTree
+from src.avl_tree import AVLTree, Node
+from src.btree import BTreeMap
+from src.ordered_map import OrderedMap
+from src.sharded import ShardedTree
+from src.sorted_array import SortedArrayMap
 
 CSV_PATH = "dataset_climate_change.csv"
 
-def build_tree(csv_path: str) -> tuple[AVLTree, object, float, object]:
+BACKENDS = {
+    "avl": AVLTree,
+    "sorted": SortedArrayMap,
+    "btree": BTreeMap,
+    "sharded": ShardedTree,
+}
+
+def build_tree(csv_path: str, backend: str = "avl") -> tuple[OrderedMap, object, float, object]:
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
     df, per_year_mean, global_mean = load_dataset(csv_path)
-    tree = AVLTree()
+    tree = BACKENDS[backend]()
+    tree.series_store = build_series_store(df)
+    tree.derived_store = load_derived(csv_path, tree.series_store)
 
+    batch = []
     for _, row in df.iterrows():
-        payload = to_payload(row)
-        tree.insert(round(payload["mean_change"], 6), payload)
+        payload = to_payload(row, tree.series_store, tree.derived_store)
+        batch.append((round(payload["mean_change"], 6), payload))
+    tree.insert_batch(batch)
     return tree, df, global_mean, per_year_mean
 
-def show_metrics(df):
+def show_metrics(tree: OrderedMap):
 
     print("\n=== Métricas disponibles ===")
-    for _, row in df.iterrows():
-        print(f"{row['ISO3']} - {row['Country']} - Media: {row['mean_change']:.6f}")
+    print("\n".join(f"{iso3} - {country} - Media: {media:.6f}" for iso3, country, media in tree.listar_metricas()))
 
-def show_node_info(tree: AVLTree, iso3: str):
+def show_node_info(tree: OrderedMap, iso3: str):
     node = tree.find_by_iso3(iso3)
     if not node:
         print("No se encontró ese ISO3 en el árbol (¿lo eliminaste?).")
         return
+    if not isinstance(node, Node):
+        print(f"ISO3: {node.data['ISO3']}  Country: {node.data.get('Country')}")
+        print(f"mean_change (clave): {node.key:.6f}")
+        print(f"(Nivel/balance/padre solo disponibles con el backend AVL; actual: {type(tree).__name__})")
+        return
     parent = node.parent.data["ISO3"] if node.parent else None
     gp = node.grandparent().data["ISO3"] if node.grandparent() else None
     uncle = node.uncle().data["ISO3"] if node.uncle() else None
@@ -33,7 +56,9 @@ def show_node_info(tree: AVLTree, iso3: str):
     print(f"Nivel: {node.level()}  |  Balance: {node.balance_factor}")
     print(f"Padre: {parent} | Abuelo: {gp} | Tío: {uncle}")
 
-def draw(tree: AVLTree):
+def draw(tree: OrderedMap):
+    if not isinstance(tree, AVLTree):
+        return
     try:
         from src.visualize import draw_tree
         draw_tree(tree.root, out_path="tree")
@@ -44,28 +69,28 @@ def draw(tree: AVLTree):
         
 def delete_all_by_iso3(tree, iso3: str) -> int:
     iso3 = (iso3 or "").strip().upper()
-    removed = 0
-    while True:
-        n = tree.find_by_iso3(iso3)
-        if not n: break
-        tree.delete(n.key)
-        removed += 1
-    return removed
+    keys = [n.key for n in tree.iter_inorder() if (str(n.data.get("ISO3") or "").strip().upper()) == iso3]
+    return tree.difference(keys) if keys else 0
 
 def level_order_recursive(tree: AVLTree):
     iso3 = tree.level_order_recursive_iso3()
     print("Recorrido por niveles (recursivo) — ISO3:")
     print(iso3)
 
-def searchh_mean(tree: AVLTree, value: float):
-
-    nodes = tree.get_nodes()
+def searchh_mean(tree: OrderedMap, value: float):
 
     value_str = str(value)
-    
+
+    # Las claves cuyo texto empieza por value_str caen en [value, value ± 10^-decimales);
+    # se recorre solo ese rango y se confirma con el prefijo.
+    if "e" in value_str or "n" in value_str:
+        candidates = tree.iter_inorder()
+    else:
+        step = 10 ** -len(value_str.split(".")[1]) if "." in value_str else 1
+        candidates = tree.iter_range(value - step, value + step)
 
     matching_nodes = [
-        (node, node.key) for node in nodes if str(node.key).startswith(value_str)
+        (node, node.key) for node in candidates if str(node.key).startswith(value_str)
     ]
     
 
@@ -73,9 +98,6 @@ def searchh_mean(tree: AVLTree, value: float):
         print(f"No se encontraron nodos con métricas que comiencen con {value_str}.")
         return
 
-
-    matching_nodes.sort(key=lambda x: x[1])
-
     print(f"\nPaíses con métricas que comienzan con '{value_str}':")
 
     for node, diff in matching_nodes:
@@ -99,12 +121,15 @@ def menu():
     print("10) Eliminar por métrica (media)")
     print("11) Consultar todas las métricas disponibles")
     print("12) Insertar país manualmente (datos completos)")
+    print("13) Recargar el CSV (aplica solo los cambios)")
+    print("14) Países que más rápido se calientan (tendencia 1961–2022)")
     print("0) Salir")
     return input("Elige opción: ").strip()
 
 if __name__ == "__main__":
-    tree, df, global_mean, per_year_mean = build_tree(CSV_PATH)
-    print(f"Cargado. Países: {len(df)}")
+    backend = sys.argv[1] if len(sys.argv) > 1 else "avl"
+    tree, df, global_mean, per_year_mean = build_tree(CSV_PATH, backend)
+    print(f"Cargado. Países: {len(df)}  |  Backend: {backend}")
 
     while True:
         op = menu()
@@ -112,8 +137,8 @@ if __name__ == "__main__":
             break
 
         elif op == "1":
-            for i, lvl in enumerate(tree.level_order_recursive_grouped_iso3()):
-                print(f"Nivel {i}: {', '.join(lvl)}")
+            for i, lvl in enumerate(tree.iter_levels()):
+                print(f"Nivel {i}: {', '.join(n.data.get('ISO3', '') for n in lvl)}")
 
 
         elif op == "2":
@@ -126,7 +151,7 @@ if __name__ == "__main__":
                     print("Ese ISO3 ya está en el árbol. (Si quieres reinsertarlo, elimínalo primero).")
                 else:
                     r = row.iloc[0]
-                    payload = to_payload(r)
+                    payload = to_payload(r, tree.series_store, tree.derived_store)
                     tree.insert(round(payload["mean_change"], 6), payload)  
                     print(f"Insertado {iso}.")
                     draw(tree) 
@@ -193,7 +218,7 @@ if __name__ == "__main__":
             try:
                 año = int(input("Ingrese el año a evaluar (1961-2022): ").strip())
                 resultados = tree.punto_4a(año) 
-                tree.mostrar_punto4a(año)
+                tree.mostrar_punto4a(año, resultados)
                 ver_info= "no"
                 if resultados:
                     print("\n" + "="*50)
@@ -232,7 +257,7 @@ if __name__ == "__main__":
             try:
                 año = int(input("Ingrese el año a evaluar (1961-2022): ").strip())
                 resultados = tree.punto_4b(año)
-                tree.mostrar_punto4b(año)
+                tree.mostrar_punto4b(año, resultados)
 
                 ver_info = "no"
                 if resultados:
@@ -272,7 +297,7 @@ if __name__ == "__main__":
             try:
                 umbral = float(input("Ingrese el valor umbral de temperatura media: ").strip())
                 resultados = tree.punto_4c(umbral)
-                tree.mostrar_punto4c(umbral)
+                tree.mostrar_punto4c(umbral, resultados)
 
                 ver_info = "no"
                 if resultados:
@@ -314,7 +339,10 @@ if __name__ == "__main__":
             show_node_info(tree, iso)
 
         elif op == "9":
-            draw(tree)
+            if isinstance(tree, AVLTree):
+                draw(tree)
+            else:
+                print("El dibujo con Graphviz solo está disponible para el backend AVL.")
 
         elif op == "10":
             try:
@@ -329,10 +357,31 @@ if __name__ == "__main__":
                 print(f"Eliminados {removed} nodo(s) con métrica ≈ {val:.6f}.")
                 draw(tree)
         elif op == "11":
-            show_metrics(df)
+            show_metrics(tree)
         elif op == "12":
             tree.insertar_manual()
             draw(tree)
+        elif op == "13":
+            try:
+                df, per_year_mean, global_mean, cambios = tree.reload(CSV_PATH)
+            except (FileNotFoundError, ValueError) as e:
+                print(f"No se pudo recargar: {e}")
+                continue
+            print(f"Recargado. Insertados: {cambios['insertados']} | Eliminados: {cambios['eliminados']} | "
+                  f"Modificados: {cambios['modificados']} | Sin cambios: {cambios['sin_cambios']}")
+            if cambios["insertados"] or cambios["eliminados"] or cambios["modificados"]:
+                draw(tree)
+        elif op == "14":
+            try:
+                k = int(input("¿Cuántos países mostrar? ").strip())
+            except ValueError:
+                print("Valor inválido.")
+                continue
+            resultados = tree.top_k_metric("trend", k)
+            if not resultados:
+                print("No hay países con tendencia calculada.")
+            for i, (iso, pendiente) in enumerate(resultados, 1):
+                print(f"{i:2d}. {iso}: {pendiente * 10:+.3f}°C por década")
         else:
             print("Opción inválida.")
     
@@ -1,6 +1,8 @@
-from collections import deque
-from typing import Optional, Any, Dict, List, Tuple, Callable
-import pandas as pd
+from bisect import bisect_left
+from fractions import Fraction
+from typing import Optional, Any, Dict, List, Tuple, Iterable, Iterator
+from src.dataset import SeriesStore
+from src.ordered_map import OrderedMap, next_key
 
 class Node:
     def __init__(self, key: float, payload: Dict[str, Any]):
@@ -9,7 +11,7 @@ class Node:
         self.left: Optional["Node"] = None
         self.right: Optional["Node"] = None
         self.parent: Optional["Node"] = None
-        self.height = 0
+        self.height = 1
 
     @property
     def balance_factor(self) -> int:
@@ -33,8 +35,9 @@ class Node:
         return gp.right if gp.left is self.parent else gp.left
 
 
-class AVLTree:
+class AVLTree(OrderedMap):
     def __init__(self):
+        super().__init__()
         self.root: Optional[Node] = None
 
 
@@ -94,20 +97,21 @@ class AVLTree:
 
 
 
-    def insert(self, key: float, payload: Dict[str, Any]) -> None:
+    def _insert(self, key: float, payload: Dict[str, Any]) -> None:
+        # La clave corrida puede pertenecer a otro subárbol: se busca una libre desde la raíz
+        key = float(key)
+        while self.find_by_key(key) is not None:
+            key = next_key(key)
 
         def _ins(r: Optional[Node], k: float, p: Dict[str, Any]) -> Node:
             if not r:
                 return Node(k, p)
             if k < r.key:
                 r.left = _ins(r.left, k, p); r.left.parent = r
-            elif k > r.key:
-                r.right = _ins(r.right, k, p); r.right.parent = r
             else:
-
-                r.right = _ins(r.right, k + 1e-9, p); r.right.parent = r
+                r.right = _ins(r.right, k, p); r.right.parent = r
             return self._rebalance(r)
-        self.root = _ins(self.root, float(key), payload)
+        self.root = _ins(self.root, key, payload)
 
     def _min_node(self, n: Node) -> Node:
         cur = n
@@ -115,7 +119,13 @@ class AVLTree:
             cur = cur.left
         return cur
 
-    def delete(self, key: float) -> None:
+    def _max_node(self, n: Node) -> Node:
+        cur = n
+        while cur.right:
+            cur = cur.right
+        return cur
+
+    def _delete(self, key: float) -> Optional[Dict[str, Any]]:
 
         def _del(r: Optional[Node], k: float) -> Optional[Node]:
             if not r:
@@ -139,7 +149,231 @@ class AVLTree:
                 if r.right: r.right.parent = r
             return self._rebalance(r) if r else None
 
+        target = self.find_by_key(key)
+        removed = target.data if target else None
         self.root = _del(self.root, float(key))
+        return removed
+
+    # ---- split / join ----
+    # Todas las operaciones trabajan sobre raíces sueltas (parent = None) y
+    # devuelven la nueva raíz con alturas y enlaces al padre ya corregidos.
+
+    def _payloads(self, n: Optional[Node]) -> List[Dict[str, Any]]:
+        return [nd.data for nd in self._iter_inorder(n)]
+
+    def _join_right(self, l: Node, m: Node, r: Optional[Node]) -> Node:
+        if self._h(l.right) <= self._h(r) + 1:
+            m.left, m.right = l.right, r
+            if m.left: m.left.parent = m
+            if m.right: m.right.parent = m
+            self._update(m)
+            l.right = m; m.parent = l
+        else:
+            l.right = self._join_right(l.right, m, r); l.right.parent = l
+        return self._rebalance(l)
+
+    def _join_left(self, l: Optional[Node], m: Node, r: Node) -> Node:
+        if self._h(r.left) <= self._h(l) + 1:
+            m.left, m.right = l, r.left
+            if m.left: m.left.parent = m
+            if m.right: m.right.parent = m
+            self._update(m)
+            r.left = m; m.parent = r
+        else:
+            r.left = self._join_left(l, m, r.left); r.left.parent = r
+        return self._rebalance(r)
+
+    def _join(self, l: Optional[Node], m: Node, r: Optional[Node]) -> Node:
+        # Precondición: claves(l) < m.key <= claves(r)
+        if self._h(l) > self._h(r) + 1:
+            root = self._join_right(l, m, r)
+        elif self._h(r) > self._h(l) + 1:
+            root = self._join_left(l, m, r)
+        else:
+            m.left, m.right = l, r
+            if l: l.parent = m
+            if r: r.parent = m
+            self._update(m)
+            root = m
+        root.parent = None
+        return root
+
+    def _pop_min(self, n: Node) -> Tuple[Optional[Node], Node]:
+        if not n.left:
+            rest = n.right
+            if rest: rest.parent = None
+            n.right = None
+            return rest, n
+        n.left, m = self._pop_min(n.left)
+        if n.left: n.left.parent = n
+        n = self._rebalance(n)
+        n.parent = None
+        return n, m
+
+    def _join2(self, l: Optional[Node], r: Optional[Node]) -> Optional[Node]:
+        if not l:
+            return r
+        if not r:
+            return l
+        rest, m = self._pop_min(r)
+        return self._join(l, m, rest)
+
+    def _split(self, n: Optional[Node], key: float, inclusive: bool = False) -> Tuple[Optional[Node], Optional[Node]]:
+        # izquierda: claves < key (<= key si inclusive); derecha: el resto
+        if not n:
+            return None, None
+        l, r = n.left, n.right
+        if l: l.parent = None
+        if r: r.parent = None
+        if (n.key <= key) if inclusive else (n.key < key):
+            rl, rr = self._split(r, key, inclusive)
+            return self._join(l, n, rl), rr
+        ll, lr = self._split(l, key, inclusive)
+        return ll, self._join(lr, n, r)
+
+    def _union(self, a: Optional[Node], b: Optional[Node], choques: List[Node]) -> Optional[Node]:
+        # Los nodos de b con la misma clave que uno de a se apartan en choques
+        # para reinsertarlos después con la clave corrida
+        if not a:
+            return b
+        if not b:
+            return a
+        l, r = a.left, a.right
+        if l: l.parent = None
+        if r: r.parent = None
+        bl, br = self._split(b, a.key)
+        if br and self._min_node(br).key == a.key:
+            br, m = self._pop_min(br)
+            choques.append(m)
+        return self._join(self._union(l, bl, choques), a, self._union(r, br, choques))
+
+    def _difference(self, n: Optional[Node], keys: List[float], lo: int, hi: int,
+                    removed: List[Dict[str, Any]]) -> Optional[Node]:
+        if not n or lo >= hi:
+            return n
+        i = bisect_left(keys, n.key, lo, hi)
+        hit = i < hi and keys[i] == n.key
+        l, r = n.left, n.right
+        if l: l.parent = None
+        if r: r.parent = None
+        # con hit, keys[i] se pasa a ambos lados: elimina también claves repetidas
+        left = self._difference(l, keys, lo, i + 1 if hit else i, removed)
+        right = self._difference(r, keys, i, hi, removed)
+        if hit:
+            removed.append(n.data)
+            n.left = n.right = None
+            return self._join2(left, right)
+        return self._join(left, n, right)
+
+    def _build_balanced(self, items: List[Tuple[float, Dict[str, Any]]], lo: int, hi: int) -> Optional[Node]:
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        n = Node(*items[mid])
+        n.left = self._build_balanced(items, lo, mid)
+        n.right = self._build_balanced(items, mid + 1, hi)
+        if n.left: n.left.parent = n
+        if n.right: n.right.parent = n
+        self._update(n)
+        return n
+
+    @classmethod
+    def _from_root(cls, root: Optional[Node], series_sum: Fraction, series_count: int,
+                   series_store: Optional[SeriesStore] = None) -> "AVLTree":
+        t = cls()
+        t.root = root
+        t.series_store = series_store
+        t._series_sum, t._series_count = series_sum, series_count
+        return t
+
+    @classmethod
+    def join(cls, t1: "AVLTree", key: float, payload: Dict[str, Any], t2: "AVLTree") -> "AVLTree":
+        # Consume t1 y t2: todas las claves de t1 < key <= todas las de t2
+        key = float(key)
+        if t1.root and t1._max_node(t1.root).key >= key:
+            raise ValueError("join: t1 debe tener claves menores que la clave pivote")
+        if t2.root and t1._min_node(t2.root).key < key:
+            raise ValueError("join: t2 debe tener claves mayores o iguales a la clave pivote")
+        t = cls._from_root(None, t1._series_sum + t2._series_sum, t1._series_count + t2._series_count,
+                           t1.series_store or t2.series_store)
+        t._aggregate(payload, 1)
+        t.root = t._join(t1.root, Node(key, payload), t2.root)
+        t1.clear(); t2.clear()
+        return t
+
+    def split(self, key: float) -> Tuple["AVLTree", "AVLTree"]:
+        # Vacía este árbol y devuelve (claves < key, claves >= key)
+        l, r = self._split(self.root, float(key))
+        small = l if self._h(l) <= self._h(r) else r
+        s_sum, s_count = Fraction(0), 0
+        for p in self._payloads(small):
+            total, count = self._series_stats(p)
+            s_sum += total; s_count += count
+        b_sum, b_count = self._series_sum - s_sum, self._series_count - s_count
+        st = self.series_store
+        if small is l:
+            res = self._from_root(l, s_sum, s_count, st), self._from_root(r, b_sum, b_count, st)
+        else:
+            res = self._from_root(l, b_sum, b_count, st), self._from_root(r, s_sum, s_count, st)
+        self.clear()
+        return res
+
+    @staticmethod
+    def _unique_batch(items: Iterable[Tuple[float, Dict[str, Any]]]) -> List[Tuple[float, Dict[str, Any]]]:
+        # Ordena el lote y corre las claves repetidas dentro de él; los choques con
+        # el árbol los resuelve _union
+        batch = sorted(((float(k), p) for k, p in items), key=lambda kp: kp[0])
+        for i in range(1, len(batch)):
+            if batch[i][0] <= batch[i - 1][0]:
+                batch[i] = (next_key(batch[i - 1][0]), batch[i][1])
+        return batch
+
+    def _absorb(self, other: "AVLTree") -> None:
+        if self._year_indexes or self._metric_indexes:
+            for p in self._payloads(other.root):
+                self._add_to_indexes(p)
+        self._series_sum += other._series_sum
+        self._series_count += other._series_count
+        self._version += 1
+        choques: List[Node] = []
+        self.root = self._union(self.root, other.root, choques)
+        other.clear()
+        # ya están contados e indexados: solo falta ubicarlos con una clave libre
+        for m in choques:
+            self._insert(m.key, m.data)
+
+    def union(self, other: "AVLTree") -> None:
+        # Absorbe los nodos de other (que queda vacío)
+        self._absorb(other)
+
+    def difference(self, keys: Iterable[float]) -> int:
+        ks = sorted(set(float(k) for k in keys))
+        removed: List[Dict[str, Any]] = []
+        self.root = self._difference(self.root, ks, 0, len(ks), removed)
+        for p in removed:
+            self._unindex_payload(p)
+        return len(removed)
+
+    def remove_range(self, low: float, high: float) -> int:
+        l, rest = self._split(self.root, float(low))
+        mid, r = self._split(rest, float(high), inclusive=True)
+        removed = self._payloads(mid)
+        self.root = self._join2(l, r)
+        for p in removed:
+            self._unindex_payload(p)
+        return len(removed)
+
+    def insert_batch(self, items: Iterable[Tuple[float, Dict[str, Any]]]) -> None:
+        batch = self._unique_batch(items)
+        other = AVLTree()
+        other.root = self._build_balanced(batch, 0, len(batch))
+        for _, p in batch:
+            other._aggregate(p, 1)
+        self._absorb(other)
+
+    def clear(self) -> None:
+        super().clear()
+        self.root = None
 
     def find_by_key(self, key: float) -> Optional[Node]:
         cur = self.root
@@ -153,33 +387,6 @@ class AVLTree:
                 return cur
         return None
 
-    def find_by_key_approx(self, key: float, tol: float = 1e-6):
-
-        n = self.find_by_key(key)
-        if n:
-            return n
-
-  
-        t = float(key)
-        def _search(nd):
-            if not nd:
-                return None
-            if abs(nd.key - t) <= tol:
-                return nd
-            if t < nd.key - tol:
-                return _search(nd.left)
-            if t > nd.key + tol:
-                return _search(nd.right)
-
-            return _search(nd.left) or _search(nd.right)
-
-        return _search(self.root)
-
-    def find_by_key_rounded(self, key: float, ndigits: int = 6):
-
-        tgt = round(float(key), ndigits)
-        return self._dfs_find(self.root, lambda nd: round(nd.key, ndigits) == tgt)
-
     def find_nearest(self, key: float):
 
         cur, best, best_diff = self.root, None, float("inf")
@@ -192,267 +399,72 @@ class AVLTree:
         return best
 
 
-    def _dfs_find(self, n: Optional[Node], pred: Callable[[Node], bool]) -> Optional[Node]:
-        if not n: return None
-        if pred(n): return n
-        left = self._dfs_find(n.left, pred)
-        if left: return left
-        return self._dfs_find(n.right, pred)
-
-    def find_by_iso3(self, iso3: str) -> Optional[Node]:
-        iso3 = (iso3 or "").strip().upper()
-        return self._dfs_find(
-            self.root,
-            lambda nd: (str(nd.data.get("ISO3") or "").strip().upper()) == iso3
-        )
-
-    def level_order_recursive_grouped_iso3(self):
-        res = []
-        def dfs(n, d):
-            if not n: return
-            if len(res) == d: res.append([])
-            res[d].append(n.data.get("ISO3",""))
-            dfs(n.left, d+1); dfs(n.right, d+1)
-        dfs(self.root, 0)
-        return res
-
-    def get_nodes(self) -> List[Node]:
-        if self.root is None:
-            return []
-        
-        nodes = []
-        queue = deque([self.root]) 
-        
-        while queue:
-            current = queue.popleft()
-            nodes.append(current)
-            
-            if current.left:
-                queue.append(current.left)
-            if current.right:
-                queue.append(current.right)
-        
-        return nodes
+    # ---- recorridos perezosos ----
+    # Memoria O(altura) para los recorridos en profundidad y O(ancho) por niveles.
 
-    def punto_4a(self, año: int) -> List[Tuple[str, float, float]]:
-        nodos = self.get_nodes()
-        
-        if not nodos:
-            return []
-        
-        if año < 1961 or año > 2022:
-            raise ValueError(f"Año {año} fuera de rango (1961-2022)")
-
-        año_str = str(año)
-        
-        temperaturas_año = []
-        for nodo in nodos:
-            series = nodo.data.get("series", {})
-            if año_str in series:
-                temp = series[año_str]
-                if not pd.isna(temp):
-                    temperaturas_año.append(temp)
-        
-        if not temperaturas_año:
-            return []
-        
-        promedio_año = sum(temperaturas_año) / len(temperaturas_año)
-        
-        resultados = []
-        for nodo in nodos:
-            series = nodo.data.get("series", {})
-            if año_str in series:
-                temp_pais = series[año_str]
-                if not pd.isna(temp_pais) and temp_pais > promedio_año:
-                    iso3 = nodo.data.get("ISO3", "N/A")
-                    resultados.append((iso3, temp_pais, promedio_año))
-        
-        return resultados
-
-    def punto_4b(self, año: int) -> List[Tuple[str, float, float]]:
-        nodos = self.get_nodes()
-        
-        if not nodos:
-            return []
-        
-        if año < 1961 or año > 2022:
-            raise ValueError(f"Año {año} fuera de rango (1961-2022)")
-        
-        año_str = str(año)
-        
-        todas_temperaturas = []
-        for nodo in nodos:
-            series = nodo.data.get("series", {})
-            for temp in series.values():
-                if not pd.isna(temp):
-                    todas_temperaturas.append(temp)
-        
-        if not todas_temperaturas:
-            return []
-        
-        promedio_total = sum(todas_temperaturas) / len(todas_temperaturas)
-        
-        resultados = []
-        for nodo in nodos:
-            series = nodo.data.get("series", {})
-            if año_str in series:
-                temp_pais = series[año_str]
-                if not pd.isna(temp_pais) and temp_pais < promedio_total:
-                    iso3 = nodo.data.get("ISO3", "N/A")
-                    resultados.append((iso3, temp_pais, promedio_total))
-        
-        return resultados
+    def _iter_inorder(self, n: Optional[Node], reverse: bool = False) -> Iterator[Node]:
+        stack: List[Node] = []
+        cur = n
+        while stack or cur:
+            while cur:
+                stack.append(cur)
+                cur = cur.right if reverse else cur.left
+            cur = stack.pop()
+            yield cur
+            cur = cur.left if reverse else cur.right
+
+    def iter_inorder(self) -> Iterator[Node]:
+        return self._iter_inorder(self.root)
+
+    def iter_reverse(self) -> Iterator[Node]:
+        return self._iter_inorder(self.root, reverse=True)
+
+    def iter_preorder(self) -> Iterator[Node]:
+        stack = [self.root] if self.root else []
+        while stack:
+            cur = stack.pop()
+            yield cur
+            if cur.right: stack.append(cur.right)
+            if cur.left: stack.append(cur.left)
+
+    def iter_levels(self) -> Iterator[List[Node]]:
+        level = [self.root] if self.root else []
+        while level:
+            yield level
+            level = [c for n in level for c in (n.left, n.right) if c]
+
+    def iter_from(self, low: float, inclusive: bool = True) -> Iterator[Node]:
+        # En orden ascendente empezando en la primera clave >= low (> low si no inclusive)
+        stack: List[Node] = []
+        cur = self.root
+        while cur:
+            if cur.key > low or (inclusive and cur.key == low):
+                stack.append(cur)
+                cur = cur.left
+            else:
+                cur = cur.right
+        while stack:
+            n = stack.pop()
+            yield n
+            cur = n.right
+            while cur:
+                stack.append(cur)
+                cur = cur.left
 
-    def punto_4c(self, valor_umbral: float) -> List[Tuple[str, float]]:
-        nodos = self.get_nodes()
-        
-        resultados = []
-        for nodo in nodos:
-            if nodo.key >= valor_umbral:
-                iso3 = nodo.data.get("ISO3", "N/A")
-                resultados.append((iso3, nodo.key))
-
-        return resultados
-
-    def mostrar_punto4a(self, año: int) -> None:
-        try:
-            resultados = self.punto_4a(año)
-            print(f"\n{'='*60}")
-            print(f"INCISO A - AÑO {año}")
-            print(f"{'='*60}")
-            
-            
-            if not resultados:
-                print("No se encontraron resultados")
-                return
-            
-            print(f"Promedio del año {año}: {resultados[0][2]:.3f}°C")
-            print("Países con temperatura mayor al promedio:")
-            print("-" * 50)
-            
-            for i, (iso, temp, prom) in enumerate(resultados, 1):
-                diferencia = temp - prom
-                print(f"{i:2d}. {iso}: {temp:.3f}°C (+{diferencia:.3f}°C)")
-            
-            print(f"\nTotal: {len(resultados)} países")
-            
-        except ValueError as e:
-            print(f"Error: {e}")
-        except Exception as e:
-            print(f"Error inesperado: {e}")
-            import traceback
-            traceback.print_exc()
-
-    def mostrar_punto4b(self, año: int) -> None:
-        try:
-            resultados = self.punto_4b(año)
-            print(f"\n{'='*60}")
-            print(f"INCISO B - AÑO {año}")
-            print(f"{'='*60}")
-            
-            if not resultados:
-                print("No se encontraron resultados")
-                return
-            
-            print(f"Promedio total: {resultados[0][2]:.3f}°C")
-            print("Países con temperatura menor al promedio total:")
-            print("-" * 50)
-            
-            for i, (iso, temp, prom_total) in enumerate(resultados, 1):
-                diferencia = prom_total - temp
-                print(f"{i:2d}. {iso}: {temp:.3f}°C (-{diferencia:.3f}°C)")
-            
-            print(f"\nTotal: {len(resultados)} países")
-            
-        except ValueError as e:
-            print(f"Error: {e}")
-
-    def mostrar_punto4c(self, valor_umbral: float) -> None:
-        resultados = self.punto_4c(valor_umbral)
-        print(f"\n{'='*60}")
-        print(f"INCISO C - TEMPERATURA MEDIA ≥ {valor_umbral}°C")
-        print(f"{'='*60}")
-        
-        if not resultados:
-            print(f"No hay países con temperatura media ≥ {valor_umbral}°C")
-            return
-        
-        print(f"Países con temperatura media ≥ {valor_umbral}°C:")
-        print("-" * 50)
-        
-        for i, (iso, temp_media) in enumerate(resultados, 1):
-            print(f"{i:2d}. {iso}: {temp_media:.3f}°C")
-        
-        print(f"\nTotal: {len(resultados)} países")
-
-
-    def delete_all_by_key(self, key: float, tol: float = 1e-9) -> int:
-        removed = 0
-        key = round(key, 6)   
-        while True:
-            node = self.find_by_key_approx(key, tol=tol)
-            if not node:
-                break
-            self.delete(node.key)
-            removed += 1
-        return removed
-    
-    def insertar_manual(self) -> None:
-        
-        
-        while True:
-            iso3 = input("Ingrese el código ISO3 del país (3 letras): ").strip().upper()
-            if len(iso3) == 3 and iso3.isalpha():
-                if self.find_by_iso3(iso3):
-                    print(f"El código ISO3 {iso3} ya existe en el árbol.")
-                    continuar = input("¿Desea intentar con otro código? (s/n): ").lower()
-                    if continuar != 's':
-                        return
-                else:
-                    break
+    def iter_down_from(self, high: float, inclusive: bool = True) -> Iterator[Node]:
+        # En orden descendente empezando en la última clave <= high (< high si no inclusive)
+        stack: List[Node] = []
+        cur = self.root
+        while cur:
+            if cur.key < high or (inclusive and cur.key == high):
+                stack.append(cur)
+                cur = cur.right
             else:
-                print(" El ISO3 debe tener exactamente 3 letras.")
-        
-        
-        country = input("Ingrese el nombre del país: ").strip()
-        
-        print("\nIngrese las temperaturas para los años 1961-2022 (62 valores):")
-        print("(Deje vacío para omitir un año)")
-        
-        series = {}
-        temperaturas_validas = []
-        años = list(range(1961, 2023))
-        
-        for año in años:
-            while True:
-                try:
-                    temp_input = input(f"Temperatura {año}: ").strip()
-                    if temp_input == "":
-                        series[str(año)] = None
-                        break
-                    else:
-                        temperatura = float(temp_input)
-                        series[str(año)] = temperatura
-                        temperaturas_validas.append(temperatura)
-                        break
-                except ValueError:
-                    print("Ingrese un número válido o deje vacío para omitir")
-        
-        if temperaturas_validas:
-            mean_change = sum(temperaturas_validas) / len(temperaturas_validas)
-            print(f"Media : {mean_change:.3f}°C (basada en {len(temperaturas_validas)} años)")
-        else:
-            mean_change = 0.0
-            print("No se ingresaron temperaturas válidas, media = 0.0")
-        
-        payload = {
-            "ISO3": iso3,
-            "Country": country,
-            "mean_change": mean_change,
-            "series": series
-        }
-        
-        self.insert(mean_change, payload)
-        print(f"{country} ({iso3}) insertado.")
-        print(f"   - Media: {mean_change:.3f}°C")
-        print(f"   - Años con datos: {len(temperaturas_validas)}/{len(años)}")
\ No newline at end of file
+                cur = cur.left
+        while stack:
+            n = stack.pop()
+            yield n
+            cur = n.left
+            while cur:
+                stack.append(cur)
+                cur = cur.right
@@ -0,0 +1,216 @@
+from bisect import bisect_left, bisect_right
+from typing import Optional, Any, Dict, List, Iterator
+from src.ordered_map import OrderedMap, Entry, next_key
+
+
+class BNode:
+    __slots__ = ("keys", "entries", "children")
+
+    def __init__(self):
+        self.keys: List[float] = []
+        self.entries: List[Entry] = []
+        self.children: List["BNode"] = []
+
+    @property
+    def leaf(self) -> bool:
+        return not self.children
+
+
+class BTreeMap(OrderedMap):
+    # B-tree de grado mínimo t: cada nodo guarda entre t-1 y 2t-1 claves, así la
+    # búsqueda toca O(log_t n) nodos anchos en lugar de O(log2 n) nodos AVL.
+    def __init__(self, t: int = 16):
+        super().__init__()
+        if t < 2:
+            raise ValueError("El grado mínimo del B-tree debe ser >= 2")
+        self.t = t
+        self.root = BNode()
+
+    def _locate(self, key: float):
+        node = self.root
+        while True:
+            i = bisect_left(node.keys, key)
+            if i < len(node.keys) and node.keys[i] == key:
+                return node, i
+            if node.leaf:
+                return None, -1
+            node = node.children[i]
+
+    def find_by_key(self, key: float) -> Optional[Entry]:
+        node, i = self._locate(float(key))
+        return node.entries[i] if node else None
+
+    def find_nearest(self, key: float) -> Optional[Entry]:
+        t = float(key)
+        up = next(self.iter_from(t), None)
+        down = next(self.iter_down_from(t), None)
+        if up is None or down is None:
+            return up or down
+        return down if abs(down.key - t) < abs(up.key - t) else up
+
+    # ---- inserción ----
+
+    def _split_child(self, parent: BNode, i: int) -> None:
+        t = self.t
+        y = parent.children[i]
+        z = BNode()
+        z.keys, z.entries = y.keys[t:], y.entries[t:]
+        if not y.leaf:
+            z.children = y.children[t:]
+            y.children = y.children[:t]
+        parent.keys.insert(i, y.keys[t - 1])
+        parent.entries.insert(i, y.entries[t - 1])
+        parent.children.insert(i + 1, z)
+        y.keys, y.entries = y.keys[:t - 1], y.entries[:t - 1]
+
+    def _insert(self, key: float, payload: Dict[str, Any]) -> None:
+        while self._locate(key)[0] is not None:
+            key = next_key(key)
+        entry = Entry(key, payload)
+        full = 2 * self.t - 1
+        if len(self.root.keys) == full:
+            new_root = BNode()
+            new_root.children.append(self.root)
+            self.root = new_root
+            self._split_child(new_root, 0)
+        node = self.root
+        while not node.leaf:
+            i = bisect_right(node.keys, key)
+            if len(node.children[i].keys) == full:
+                self._split_child(node, i)
+                if key > node.keys[i]:
+                    i += 1
+            node = node.children[i]
+        i = bisect_right(node.keys, key)
+        node.keys.insert(i, key)
+        node.entries.insert(i, entry)
+
+    # ---- borrado (CLRS: se baja asegurando al menos t claves en cada hijo) ----
+
+    def _merge(self, node: BNode, i: int) -> None:
+        left, right = node.children[i], node.children[i + 1]
+        left.keys += [node.keys.pop(i)] + right.keys
+        left.entries += [node.entries.pop(i)] + right.entries
+        left.children += right.children
+        node.children.pop(i + 1)
+
+    def _fill(self, node: BNode, i: int) -> int:
+        t = self.t
+        child = node.children[i]
+        if i > 0 and len(node.children[i - 1].keys) >= t:
+            left = node.children[i - 1]
+            child.keys.insert(0, node.keys[i - 1])
+            child.entries.insert(0, node.entries[i - 1])
+            node.keys[i - 1] = left.keys.pop()
+            node.entries[i - 1] = left.entries.pop()
+            if not left.leaf:
+                child.children.insert(0, left.children.pop())
+        elif i < len(node.children) - 1 and len(node.children[i + 1].keys) >= t:
+            right = node.children[i + 1]
+            child.keys.append(node.keys[i])
+            child.entries.append(node.entries[i])
+            node.keys[i] = right.keys.pop(0)
+            node.entries[i] = right.entries.pop(0)
+            if not right.leaf:
+                child.children.append(right.children.pop(0))
+        elif i < len(node.children) - 1:
+            self._merge(node, i)
+        else:
+            self._merge(node, i - 1)
+            i -= 1
+        return i
+
+    def _remove(self, node: BNode, key: float) -> Optional[Entry]:
+        t = self.t
+        i = bisect_left(node.keys, key)
+        if i < len(node.keys) and node.keys[i] == key:
+            if node.leaf:
+                node.keys.pop(i)
+                return node.entries.pop(i)
+            found = node.entries[i]
+            left, right = node.children[i], node.children[i + 1]
+            if len(left.keys) >= t:
+                pred = left
+                while not pred.leaf:
+                    pred = pred.children[-1]
+                e = self._remove(left, pred.keys[-1])
+                node.keys[i], node.entries[i] = e.key, e
+                return found
+            if len(right.keys) >= t:
+                succ = right
+                while not succ.leaf:
+                    succ = succ.children[0]
+                e = self._remove(right, succ.keys[0])
+                node.keys[i], node.entries[i] = e.key, e
+                return found
+            self._merge(node, i)
+            return self._remove(left, key)
+        if node.leaf:
+            return None
+        if len(node.children[i].keys) < t:
+            i = self._fill(node, i)
+        return self._remove(node.children[i], key)
+
+    def _delete(self, key: float) -> Optional[Dict[str, Any]]:
+        if self._locate(key)[0] is None:
+            return None
+        removed = self._remove(self.root, key)
+        if not self.root.keys and not self.root.leaf:
+            self.root = self.root.children[0]
+        return removed.data if removed else None
+
+    # ---- recorridos ----
+
+    def _walk(self, node: BNode, reverse: bool = False) -> Iterator[Entry]:
+        if node.leaf:
+            yield from (reversed(node.entries) if reverse else node.entries)
+            return
+        n = len(node.entries)
+        order = range(n - 1, -1, -1) if reverse else range(n)
+        yield from self._walk(node.children[n if reverse else 0], reverse)
+        for j in order:
+            yield node.entries[j]
+            yield from self._walk(node.children[j if reverse else j + 1], reverse)
+
+    def _walk_from(self, node: BNode, low: float, inclusive: bool) -> Iterator[Entry]:
+        i = bisect_left(node.keys, low) if inclusive else bisect_right(node.keys, low)
+        if not node.leaf:
+            yield from self._walk_from(node.children[i], low, inclusive)
+        for j in range(i, len(node.keys)):
+            yield node.entries[j]
+            if not node.leaf:
+                yield from self._walk(node.children[j + 1])
+
+    def _walk_down_from(self, node: BNode, high: float, inclusive: bool) -> Iterator[Entry]:
+        j = bisect_right(node.keys, high) if inclusive else bisect_left(node.keys, high)
+        if not node.leaf:
+            yield from self._walk_down_from(node.children[j], high, inclusive)
+        for m in range(j - 1, -1, -1):
+            yield node.entries[m]
+            if not node.leaf:
+                yield from self._walk(node.children[m], reverse=True)
+
+    def iter_inorder(self) -> Iterator[Entry]:
+        return self._walk(self.root)
+
+    def iter_reverse(self) -> Iterator[Entry]:
+        return self._walk(self.root, reverse=True)
+
+    def iter_from(self, low: float, inclusive: bool = True) -> Iterator[Entry]:
+        return self._walk_from(self.root, low, inclusive)
+
+    def iter_down_from(self, high: float, inclusive: bool = True) -> Iterator[Entry]:
+        return self._walk_down_from(self.root, high, inclusive)
+
+    def iter_levels(self) -> Iterator[List[Entry]]:
+        level = [self.root] if self.root.keys else []
+        while level:
+            yield [e for n in level for e in n.entries]
+            level = [c for n in level for c in n.children]
+
+    def is_empty(self) -> bool:
+        return not self.root.keys
+
+    def clear(self) -> None:
+        super().clear()
+        self.root = BNode()
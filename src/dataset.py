@@ -1,5 +1,8 @@
+import hashlib
+import os
+import numpy as np
 import pandas as pd
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Iterator, Mapping, Optional
 
 def _try_read(csv_path: str):
     for sep in [",", ";"]:
@@ -11,9 +14,12 @@ def _try_read(csv_path: str):
                 continue
     raise FileNotFoundError(f"No pude leer el CSV: {csv_path}")
 
+def _year_cols(columns) -> List[str]:
+    return [c for c in columns if isinstance(c, str) and c.startswith("F") and c[1:].isdigit()]
+
 def load_dataset(csv_path: str) -> Tuple[pd.DataFrame, Dict[str, float], float]:
     df = _try_read(csv_path)
-    year_cols: List[str] = [c for c in df.columns if isinstance(c, str) and c.startswith("F") and c[1:].isdigit()]
+    year_cols: List[str] = _year_cols(df.columns)
     if not year_cols:
         raise ValueError("No encontré columnas F1961..F2022 en el CSV.")
 
@@ -23,8 +29,181 @@ def load_dataset(csv_path: str) -> Tuple[pd.DataFrame, Dict[str, float], float]:
     df = df.dropna(subset=["mean_change"]).reset_index(drop=True)
     return df, per_year_mean, global_mean
 
-def to_payload(row: pd.Series) -> Dict[str, Any]:
-    series = {c[1:]: row[c] for c in row.index if isinstance(c, str) and c.startswith("F") and c[1:].isdigit()}
+class SeriesStore:
+    # Bloque contiguo (filas = países, columnas = años) compartido por todos los payloads.
+    # Los años faltantes se guardan como NaN.
+    def __init__(self, years: List[str], dtype=np.float64):
+        self.years = list(years)
+        self.year_pos = {y: i for i, y in enumerate(self.years)}
+        self.values = np.empty((0, len(self.years)), dtype=dtype)
+        self.size = 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dtype=np.float64) -> "SeriesStore":
+        cols = _year_cols(df.columns)
+        store = cls([c[1:] for c in cols], dtype)
+        store.values = np.ascontiguousarray(df[cols].to_numpy(dtype=dtype, na_value=np.nan))
+        store.size = len(store.values)
+        return store
+
+    @property
+    def rows(self) -> np.ndarray:
+        return self.values[:self.size]
+
+    def append(self, series: Mapping[str, Optional[float]]) -> int:
+        if self.size == len(self.values):
+            grown = np.full((max(8, 2 * len(self.values)), len(self.years)), np.nan, dtype=self.values.dtype)
+            grown[:self.size] = self.values[:self.size]
+            self.values = grown
+        row = self.values[self.size]
+        row[:] = np.nan
+        for y, v in series.items():
+            if y in self.year_pos and v is not None and not pd.isna(v):
+                row[self.year_pos[y]] = float(v)
+        self.size += 1
+        return self.size - 1
+
+    def view(self, row: int) -> "SeriesView":
+        return SeriesView(self, row)
+
+
+class SeriesView(Mapping):
+    # Vista de solo lectura año -> temperatura sobre una fila del SeriesStore.
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: SeriesStore, row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def store(self) -> SeriesStore:
+        return self._store
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    @property
+    def array(self) -> np.ndarray:
+        # vista sin copia pero de solo lectura: la fila es compartida con el bloque
+        arr = self._store.values[self._row].view()
+        arr.setflags(write=False)
+        return arr
+
+    def __getitem__(self, year: str) -> float:
+        return float(self._store.values[self._row, self._store.year_pos[year]])
+
+    def __contains__(self, year) -> bool:
+        return year in self._store.year_pos
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.years)
+
+    def __len__(self) -> int:
+        return len(self._store.years)
+
+    def __repr__(self) -> str:
+        return f"SeriesView({dict(self)!r})"
+
+
+def build_series_store(df: pd.DataFrame, dtype=np.float64) -> SeriesStore:
+    return SeriesStore.from_frame(df, dtype)
+
+# ---- métricas derivadas (vectorizadas sobre todos los países) ----
+
+DERIVED_CACHE_VERSION = "1"
+
+def _nan_mean(values: np.ndarray, axis: int = 1) -> np.ndarray:
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=axis)
+    total = np.where(valid, values, 0.0).sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+def rolling_means(store: SeriesStore, window: int = 10) -> np.ndarray:
+    # Media móvil por país: columna j = media de los años [j, j + window).
+    values = store.rows.astype(np.float64)
+    valid = ~np.isnan(values)
+    zeros = np.zeros((len(values), 1))
+    csum = np.hstack([zeros, np.cumsum(np.where(valid, values, 0.0), axis=1)])
+    ccount = np.hstack([zeros, np.cumsum(valid, axis=1)])
+    total = csum[:, window:] - csum[:, :-window]
+    count = ccount[:, window:] - ccount[:, :-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+def derive_metrics(store: SeriesStore, window: int = 10) -> SeriesStore:
+    # Tendencia (pendiente de mínimos cuadrados, °C/año), medias por década y
+    # media de la última ventana móvil. Devuelve un bloque con una fila por país.
+    values = store.rows.astype(np.float64)
+    years = np.array([int(y) for y in store.years], dtype=np.float64)
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = (valid * years).sum(axis=1) / n
+        y_mean = np.where(valid, values, 0.0).sum(axis=1) / n
+        dx = np.where(valid, years - x_mean[:, None], 0.0)
+        dy = np.where(valid, values - y_mean[:, None], 0.0)
+        trend = np.where(n >= 2, (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1), np.nan)
+
+    names, cols = ["trend"], [trend]
+    rolling = rolling_means(store, window) if len(years) >= window else np.full((len(values), 1), np.nan)
+    names.append(f"rolling_{window}")
+    cols.append(rolling[:, -1] if rolling.shape[1] else np.full(len(values), np.nan))
+
+    start = int(years[0]) if len(years) else 0
+    decade = ((years - start) // 10).astype(int)
+    for d in np.unique(decade):
+        sel = decade == d
+        names.append(f"decade_{int(years[sel][0])}_{int(years[sel][-1])}")
+        cols.append(_nan_mean(values[:, sel]))
+
+    derived = SeriesStore(names)
+    derived.values = np.ascontiguousarray(np.column_stack(cols)) if len(values) else np.empty((0, len(names)))
+    derived.size = len(values)
+    return derived
+
+def load_derived(csv_path: str, store: SeriesStore, window: int = 10) -> SeriesStore:
+    # Igual que derive_metrics, pero guardando el resultado junto al CSV; se reutiliza
+    # mientras los valores anuales no cambien.
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{DERIVED_CACHE_VERSION}|{window}|{','.join(store.years)}".encode("utf-8"))
+    h.update(np.ascontiguousarray(store.rows, dtype=np.float64).tobytes())
+    key = h.hexdigest()
+    cache_path = os.path.splitext(csv_path)[0] + "_derived.npz"
+
+    try:
+        with np.load(cache_path, allow_pickle=False) as cached:
+            if str(cached["key"]) == key:
+                derived = SeriesStore([str(n) for n in cached["names"]])
+                derived.values = np.ascontiguousarray(cached["values"])
+                derived.size = len(derived.values)
+                return derived
+    except (OSError, KeyError, ValueError):
+        pass
+
+    derived = derive_metrics(store, window)
+    try:
+        np.savez(cache_path, key=np.array(key), names=np.array(derived.years), values=derived.rows)
+    except OSError:
+        pass
+    return derived
+
+def to_payload(row: pd.Series, store: Optional[SeriesStore] = None,
+               derived: Optional[SeriesStore] = None) -> Dict[str, Any]:
+    if store is not None and isinstance(row.name, (int, np.integer)) and 0 <= row.name < store.size:
+        series = store.view(int(row.name))
+    else:
+        cols = _year_cols(row.index)
+        if store is None:
+            store = SeriesStore([c[1:] for c in cols])
+        series = store.view(store.append({c[1:]: row[c] for c in cols}))
+
+    if derived is not None and series.row < derived.size:
+        metrics = derived.view(series.row)
+    else:
+        metrics = derived_view(series)
 
 
     iso_raw = row.get("ISO3")
@@ -39,4 +218,33 @@ def to_payload(row: pd.Series) -> Dict[str, Any]:
         "ISO3": iso,
         "mean_change": float(row.get("mean_change")),
         "series": series,
+        "derived": metrics,
     }
+
+def derived_view(series: SeriesView) -> SeriesView:
+    # Métricas derivadas de una sola serie (filas sueltas: inserción manual, CSV sin bloque).
+    one = SeriesStore(series.store.years)
+    one.values = series.array.reshape(1, -1).astype(np.float64)
+    one.size = 1
+    return derive_metrics(one).view(0)
+
+def row_identity(payload: Dict[str, Any]) -> Tuple[Optional[str], str]:
+    oid = payload.get("ObjectId")
+    if oid is None or pd.isna(oid):
+        oid = None
+    elif isinstance(oid, (float, np.floating)) and float(oid).is_integer():
+        oid = str(int(oid))
+    else:
+        oid = str(oid)
+    return oid, payload.get("ISO3") or ""
+
+def row_fingerprint(payload: Dict[str, Any]) -> str:
+    series = payload.get("series") or {}
+    arr = getattr(series, "array", None)
+    if arr is None:
+        arr = np.array([np.nan if v is None else v for v in series.values()], dtype=np.float64)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(payload.get("Country") or "").encode("utf-8"))
+    h.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
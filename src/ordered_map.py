@@ -0,0 +1,592 @@
+from abc import ABC, abstractmethod
+import inspect
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from functools import wraps
+from itertools import islice
+from fractions import Fraction
+from math import inf, nextafter
+from typing import Optional, Any, Dict, List, Tuple, Iterable, Iterator
+import numpy as np
+import pandas as pd
+from src.dataset import (
+    SeriesStore, load_dataset, to_payload, build_series_store, load_derived, derived_view,
+    row_identity, row_fingerprint
+)
+
+
+def next_key(key: float) -> float:
+    # Siguiente clave para desempatar: +1e-9, o el float inmediato cuando la
+    # magnitud es tan grande que sumar 1e-9 ya no cambia el valor.
+    nxt = key + 1e-9
+    return nxt if nxt != key else nextafter(key, inf)
+
+
+def exact_sum(values: Iterable[float]) -> Fraction:
+    # Suma sin redondeo: cada float es n / 2^k, así que se llevan todos al mayor
+    # denominador y se suman como enteros. float(resultado) queda bien redondeado.
+    pares = [float(v).as_integer_ratio() for v in values]
+    if not pares:
+        return Fraction(0)
+    den = max(d for _, d in pares)
+    return Fraction(sum(n * (den // d) for n, d in pares), den)
+
+
+class SortedIndex:
+    # Índice secundario ordenado: claves y payloads en listas paralelas.
+    def __init__(self):
+        self.keys: List[float] = []
+        self.items: List[Dict[str, Any]] = []
+        # Suma exacta: un acumulado float con += / -= deriva según el historial de
+        # ediciones y movería valores que caen justo en la media.
+        self.total = Fraction(0)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: float, item: Dict[str, Any]) -> None:
+        i = bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.items.insert(i, item)
+        self.total += Fraction(key)
+
+    def discard(self, key: float, item: Dict[str, Any]) -> bool:
+        i = bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key:
+            if self.items[i] is item:
+                del self.keys[i]
+                del self.items[i]
+                self.total -= Fraction(key)
+                return True
+            i += 1
+        return False
+
+    def mean(self) -> Optional[float]:
+        return float(self.total / len(self.keys)) if self.keys else None
+
+    def above(self, value: float, inclusive: bool = False) -> List[Tuple[float, Dict[str, Any]]]:
+        i = bisect_left(self.keys, value) if inclusive else bisect_right(self.keys, value)
+        return list(zip(self.keys[i:], self.items[i:]))
+
+    def below(self, value: float, inclusive: bool = False) -> List[Tuple[float, Dict[str, Any]]]:
+        j = bisect_right(self.keys, value) if inclusive else bisect_left(self.keys, value)
+        return list(zip(self.keys[:j], self.items[:j]))
+
+    def top_k(self, k: int) -> List[Tuple[float, Dict[str, Any]]]:
+        k = max(0, min(k, len(self.keys)))
+        return [(self.keys[i], self.items[i]) for i in range(len(self.keys) - 1, len(self.keys) - 1 - k, -1)]
+
+    def bottom_k(self, k: int) -> List[Tuple[float, Dict[str, Any]]]:
+        k = max(0, k)
+        return list(zip(self.keys[:k], self.items[:k]))
+
+
+class Entry:
+    # Par clave/payload que devuelven los backends sin nodos propios (find_*, iter_*).
+    __slots__ = ("key", "data")
+
+    def __init__(self, key: float, payload: Dict[str, Any]):
+        self.key = float(key)
+        self.data = payload
+
+    def __repr__(self) -> str:
+        return f"Entry({self.key!r}, {self.data.get('ISO3')!r})"
+
+
+def cached_query(method):
+    # Cachea el resultado por (método, argumentos, versión del árbol). La versión
+    # cambia con cada inserción/eliminación, así que nunca se sirve un dato viejo.
+    # Los argumentos se normalizan con la firma (posicional, nombrado o por defecto
+    # dan la misma clave) y se devuelve una copia para que el llamador no altere la caché.
+    firma = inspect.signature(method)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = firma.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (method.__name__, tuple(bound.arguments.items())[1:], self._version)
+        cache = self._query_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return list(cache[key])
+        res = method(self, *args, **kwargs)
+        cache[key] = tuple(res)
+        if len(cache) > self.CACHE_SIZE:
+            cache.popitem(last=False)
+        return list(res)
+    return wrapper
+
+
+class OrderedMap(ABC):
+    # Interfaz común de los backends ordenados por mean_change.
+    # Cada backend implementa el almacenamiento (_insert/_delete, búsquedas e
+    # iteradores ordenados); aquí viven los agregados, los índices por año y
+    # las consultas del laboratorio construidas sobre esos primitivos.
+
+    def __init__(self):
+        self.series_store: Optional[SeriesStore] = None
+        self.derived_store: Optional[SeriesStore] = None
+        self._year_indexes: Dict[str, SortedIndex] = {}
+        self._metric_indexes: Dict[str, SortedIndex] = {}
+        self._series_sum = Fraction(0)
+        self._series_count = 0
+        self._version = 0
+        self._query_cache: "OrderedDict[tuple, Any]" = OrderedDict()
+
+    CACHE_SIZE = 64
+
+    # ---- primitivas de cada backend ----
+
+    @abstractmethod
+    def _insert(self, key: float, payload: Dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def _delete(self, key: float) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def find_by_key(self, key: float) -> Optional[Any]: ...
+
+    @abstractmethod
+    def find_nearest(self, key: float) -> Optional[Any]: ...
+
+    @abstractmethod
+    def iter_inorder(self) -> Iterator[Any]: ...
+
+    @abstractmethod
+    def iter_reverse(self) -> Iterator[Any]: ...
+
+    @abstractmethod
+    def iter_from(self, low: float, inclusive: bool = True) -> Iterator[Any]: ...
+
+    @abstractmethod
+    def iter_down_from(self, high: float, inclusive: bool = True) -> Iterator[Any]: ...
+
+    # ---- operaciones públicas ----
+
+    def insert(self, key: float, payload: Dict[str, Any]) -> None:
+        self._insert(float(key), payload)
+        self._index_payload(payload)
+
+    def delete(self, key: float) -> None:
+        removed = self._delete(float(key))
+        if removed is not None:
+            self._unindex_payload(removed)
+
+    def is_empty(self) -> bool:
+        return next(self.iter_inorder(), None) is None
+
+    def clear(self) -> None:
+        self._year_indexes = {}
+        self._metric_indexes = {}
+        self._series_sum = Fraction(0)
+        self._series_count = 0
+        self._version += 1
+        self._query_cache.clear()
+
+    def insert_batch(self, items: Iterable[Tuple[float, Dict[str, Any]]]) -> None:
+        for key, payload in items:
+            self.insert(key, payload)
+
+    def difference(self, keys: Iterable[float]) -> int:
+        removed = 0
+        for key in sorted(set(float(k) for k in keys)):
+            if self.find_by_key(key) is not None:
+                self.delete(key)
+                removed += 1
+        return removed
+
+    def remove_range(self, low: float, high: float) -> int:
+        return self.difference([n.key for n in self.iter_range(low, high)])
+
+    def reload(self, csv_path: str) -> Tuple[pd.DataFrame, Dict[str, float], float, Dict[str, int]]:
+        # Recarga incremental: compara cada fila del CSV (ObjectId/ISO3 + huella de
+        # sus valores) con lo que hay en el árbol y aplica solo las diferencias.
+        # Las entradas sin ObjectId (insertadas a mano) no se tocan.
+        df, per_year_mean, global_mean = load_dataset(csv_path)
+        store = build_series_store(df)
+        derived = load_derived(csv_path, store)
+
+        actuales = {}
+        for n in self.iter_inorder():
+            ident = row_identity(n.data)
+            if ident[0] is not None:
+                actuales[ident] = (n.key, n.data)
+
+        nuevos: List[Dict[str, Any]] = []
+        borrar: List[float] = []
+        vistos = set()
+        modificados = sin_cambios = 0
+        for _, row in df.iterrows():
+            payload = to_payload(row, store, derived)
+            ident = row_identity(payload)
+            vistos.add(ident)
+            actual = actuales.get(ident)
+            if actual is None:
+                nuevos.append(payload)
+            elif row_fingerprint(actual[1]) != row_fingerprint(payload):
+                borrar.append(actual[0])
+                nuevos.append(payload)
+                modificados += 1
+            else:
+                # mismos valores: se apunta al bloque nuevo para liberar el anterior
+                actual[1]["series"] = payload["series"]
+                actual[1]["derived"] = payload["derived"]
+                sin_cambios += 1
+
+        eliminados = [key for ident, (key, _) in actuales.items() if ident not in vistos]
+        self.difference(borrar + eliminados)
+        self.insert_batch((round(p["mean_change"], 6), p) for p in nuevos)
+        self.series_store = store
+        self.derived_store = derived
+
+        cambios = {
+            "insertados": len(nuevos) - modificados,
+            "eliminados": len(eliminados),
+            "modificados": modificados,
+            "sin_cambios": sin_cambios,
+        }
+        return df, per_year_mean, global_mean, cambios
+
+    def find_by_key_approx(self, key: float, tol: float = 1e-6):
+        n = self.find_by_key(key)
+        if n:
+            return n
+        return next(self.iter_range(float(key) - tol, float(key) + tol), None)
+
+    def find_by_key_rounded(self, key: float, ndigits: int = 6):
+        tgt = round(float(key), ndigits)
+        step = 10 ** -ndigits
+        for n in self.iter_range(tgt - step, tgt + step):
+            if round(n.key, ndigits) == tgt:
+                return n
+        return None
+
+    def find_by_iso3(self, iso3: str) -> Optional[Any]:
+        iso3 = (iso3 or "").strip().upper()
+        for n in self.iter_inorder():
+            if (str(n.data.get("ISO3") or "").strip().upper()) == iso3:
+                return n
+        return None
+
+    def iter_levels(self) -> Iterator[List[Any]]:
+        # Estructura plana por defecto: un único nivel con todas las entradas.
+        level = list(self.iter_inorder())
+        if level:
+            yield level
+
+    def iter_level_order(self) -> Iterator[Any]:
+        for level in self.iter_levels():
+            yield from level
+
+    def iter_range(self, low: float, high: float) -> Iterator[Any]:
+        for n in self.iter_from(low):
+            if n.key > high:
+                return
+            yield n
+
+    def top_k(self, n: int) -> List[Any]:
+        return list(islice(self.iter_reverse(), max(0, n)))
+
+    def bottom_k(self, n: int) -> List[Any]:
+        return list(islice(self.iter_inorder(), max(0, n)))
+
+    def get_nodes(self) -> List[Any]:
+        return list(self.iter_level_order())
+
+    @staticmethod
+    def _valor_año(payload: Dict[str, Any], año_str: str) -> Optional[float]:
+        temp = (payload.get("series") or {}).get(año_str)
+        if temp is None or pd.isna(temp):
+            return None
+        return float(temp)
+
+    @staticmethod
+    def _valor_metrica(payload: Dict[str, Any], metrica: str) -> Optional[float]:
+        valor = (payload.get("derived") or {}).get(metrica)
+        if valor is None or pd.isna(valor):
+            return None
+        return float(valor)
+
+    @staticmethod
+    def _series_stats(payload: Dict[str, Any]) -> Tuple[Fraction, int]:
+        series = payload.get("series") or {}
+        arr = getattr(series, "array", None)
+        if arr is not None:
+            valid = arr[~np.isnan(arr)]
+            return exact_sum(valid.tolist()), int(valid.size)
+        temps = [float(t) for t in series.values() if t is not None and not pd.isna(t)]
+        return exact_sum(temps), len(temps)
+
+    def _aggregate(self, payload: Dict[str, Any], sign: int = 1) -> None:
+        total, count = self._series_stats(payload)
+        self._series_sum += sign * total
+        self._series_count += sign * count
+
+    def _index_payload(self, payload: Dict[str, Any]) -> None:
+        self._version += 1
+        self._aggregate(payload, 1)
+        self._add_to_indexes(payload)
+
+    def _add_to_indexes(self, payload: Dict[str, Any]) -> None:
+        # Todas las familias de índices (por año y por métrica) se actualizan aquí
+        for año_str, indice in self._year_indexes.items():
+            temp = self._valor_año(payload, año_str)
+            if temp is not None:
+                indice.add(temp, payload)
+        for metrica, indice in self._metric_indexes.items():
+            valor = self._valor_metrica(payload, metrica)
+            if valor is not None:
+                indice.add(valor, payload)
+
+    def _unindex_payload(self, payload: Dict[str, Any]) -> None:
+        self._version += 1
+        self._aggregate(payload, -1)
+        self._remove_from_indexes(payload)
+
+    def _remove_from_indexes(self, payload: Dict[str, Any]) -> None:
+        for año_str, indice in self._year_indexes.items():
+            temp = self._valor_año(payload, año_str)
+            if temp is not None:
+                indice.discard(temp, payload)
+        for metrica, indice in self._metric_indexes.items():
+            valor = self._valor_metrica(payload, metrica)
+            if valor is not None:
+                indice.discard(valor, payload)
+
+    def year_index(self, año: int) -> SortedIndex:
+        año_str = str(año)
+        indice = self._year_indexes.get(año_str)
+        if indice is None:
+            indice = SortedIndex()
+            for nodo in self.iter_inorder():
+                temp = self._valor_año(nodo.data, año_str)
+                if temp is not None:
+                    indice.add(temp, nodo.data)
+            self._year_indexes[año_str] = indice
+        return indice
+
+    @cached_query
+    def above_in_year(self, año: int, valor: float, inclusive: bool = False) -> List[Tuple[str, float]]:
+        return [(p.get("ISO3", "N/A"), t) for t, p in self.year_index(año).above(valor, inclusive)]
+
+    @cached_query
+    def below_in_year(self, año: int, valor: float, inclusive: bool = False) -> List[Tuple[str, float]]:
+        return [(p.get("ISO3", "N/A"), t) for t, p in self.year_index(año).below(valor, inclusive)]
+
+    @cached_query
+    def top_k_year(self, año: int, k: int) -> List[Tuple[str, float]]:
+        return [(p.get("ISO3", "N/A"), t) for t, p in self.year_index(año).top_k(k)]
+
+    @cached_query
+    def bottom_k_year(self, año: int, k: int) -> List[Tuple[str, float]]:
+        return [(p.get("ISO3", "N/A"), t) for t, p in self.year_index(año).bottom_k(k)]
+
+    def metric_index(self, metrica: str) -> SortedIndex:
+        # Índice ordenado por una métrica derivada (trend, rolling_10, decade_...).
+        indice = self._metric_indexes.get(metrica)
+        if indice is None:
+            indice = SortedIndex()
+            for nodo in self.iter_inorder():
+                valor = self._valor_metrica(nodo.data, metrica)
+                if valor is not None:
+                    indice.add(valor, nodo.data)
+            self._metric_indexes[metrica] = indice
+        return indice
+
+    @cached_query
+    def above_metric(self, metrica: str, valor: float, inclusive: bool = False) -> List[Tuple[str, float]]:
+        return [(p.get("ISO3", "N/A"), v) for v, p in self.metric_index(metrica).above(valor, inclusive)]
+
+    @cached_query
+    def below_metric(self, metrica: str, valor: float, inclusive: bool = False) -> List[Tuple[str, float]]:
+        return [(p.get("ISO3", "N/A"), v) for v, p in self.metric_index(metrica).below(valor, inclusive)]
+
+    @cached_query
+    def top_k_metric(self, metrica: str, k: int) -> List[Tuple[str, float]]:
+        return [(p.get("ISO3", "N/A"), v) for v, p in self.metric_index(metrica).top_k(k)]
+
+    @cached_query
+    def bottom_k_metric(self, metrica: str, k: int) -> List[Tuple[str, float]]:
+        return [(p.get("ISO3", "N/A"), v) for v, p in self.metric_index(metrica).bottom_k(k)]
+
+    @cached_query
+    def punto_4a(self, año: int) -> List[Tuple[str, float, float]]:
+        if self.is_empty():
+            return []
+
+        if año < 1961 or año > 2022:
+            raise ValueError(f"Año {año} fuera de rango (1961-2022)")
+
+        indice = self.year_index(año)
+        if not len(indice):
+            return []
+
+        promedio_año = indice.mean()
+        return [(iso3, temp, promedio_año) for iso3, temp in self.above_in_year(año, promedio_año)]
+
+    @cached_query
+    def punto_4b(self, año: int) -> List[Tuple[str, float, float]]:
+        if self.is_empty():
+            return []
+
+        if año < 1961 or año > 2022:
+            raise ValueError(f"Año {año} fuera de rango (1961-2022)")
+
+        if self._series_count == 0:
+            return []
+
+        promedio_total = float(self._series_sum / self._series_count)
+        return [(iso3, temp, promedio_total) for iso3, temp in self.below_in_year(año, promedio_total)]
+
+    @cached_query
+    def punto_4c(self, valor_umbral: float) -> List[Tuple[str, float]]:
+        return [(nodo.data.get("ISO3", "N/A"), nodo.key) for nodo in self.iter_from(valor_umbral)]
+
+    @cached_query
+    def listar_metricas(self) -> List[Tuple[str, str, float]]:
+        return [(n.data.get("ISO3", ""), n.data.get("Country", ""), n.key) for n in self.iter_inorder()]
+
+    def mostrar_punto4a(self, año: int, resultados: Optional[List[Tuple[str, float, float]]] = None) -> None:
+        try:
+            if resultados is None:
+                resultados = self.punto_4a(año)
+            print(f"\n{'='*60}")
+            print(f"INCISO A - AÑO {año}")
+            print(f"{'='*60}")
+            
+            
+            if not resultados:
+                print("No se encontraron resultados")
+                return
+            
+            print(f"Promedio del año {año}: {resultados[0][2]:.3f}°C")
+            print("Países con temperatura mayor al promedio:")
+            print("-" * 50)
+            
+            for i, (iso, temp, prom) in enumerate(resultados, 1):
+                diferencia = temp - prom
+                print(f"{i:2d}. {iso}: {temp:.3f}°C (+{diferencia:.3f}°C)")
+            
+            print(f"\nTotal: {len(resultados)} países")
+            
+        except ValueError as e:
+            print(f"Error: {e}")
+        except Exception as e:
+            print(f"Error inesperado: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def mostrar_punto4b(self, año: int, resultados: Optional[List[Tuple[str, float, float]]] = None) -> None:
+        try:
+            if resultados is None:
+                resultados = self.punto_4b(año)
+            print(f"\n{'='*60}")
+            print(f"INCISO B - AÑO {año}")
+            print(f"{'='*60}")
+            
+            if not resultados:
+                print("No se encontraron resultados")
+                return
+            
+            print(f"Promedio total: {resultados[0][2]:.3f}°C")
+            print("Países con temperatura menor al promedio total:")
+            print("-" * 50)
+            
+            for i, (iso, temp, prom_total) in enumerate(resultados, 1):
+                diferencia = prom_total - temp
+                print(f"{i:2d}. {iso}: {temp:.3f}°C (-{diferencia:.3f}°C)")
+            
+            print(f"\nTotal: {len(resultados)} países")
+            
+        except ValueError as e:
+            print(f"Error: {e}")
+
+    def mostrar_punto4c(self, valor_umbral: float, resultados: Optional[List[Tuple[str, float]]] = None) -> None:
+        if resultados is None:
+            resultados = self.punto_4c(valor_umbral)
+        print(f"\n{'='*60}")
+        print(f"INCISO C - TEMPERATURA MEDIA ≥ {valor_umbral}°C")
+        print(f"{'='*60}")
+        
+        if not resultados:
+            print(f"No hay países con temperatura media ≥ {valor_umbral}°C")
+            return
+        
+        print(f"Países con temperatura media ≥ {valor_umbral}°C:")
+        print("-" * 50)
+        
+        for i, (iso, temp_media) in enumerate(resultados, 1):
+            print(f"{i:2d}. {iso}: {temp_media:.3f}°C")
+        
+        print(f"\nTotal: {len(resultados)} países")
+
+
+    def delete_all_by_key(self, key: float, tol: float = 1e-9) -> int:
+        key = round(key, 6)
+        return self.remove_range(key - tol, key + tol)
+    
+    def insertar_manual(self) -> None:
+        
+        
+        while True:
+            iso3 = input("Ingrese el código ISO3 del país (3 letras): ").strip().upper()
+            if len(iso3) == 3 and iso3.isalpha():
+                if self.find_by_iso3(iso3):
+                    print(f"El código ISO3 {iso3} ya existe en el árbol.")
+                    continuar = input("¿Desea intentar con otro código? (s/n): ").lower()
+                    if continuar != 's':
+                        return
+                else:
+                    break
+            else:
+                print(" El ISO3 debe tener exactamente 3 letras.")
+        
+        
+        country = input("Ingrese el nombre del país: ").strip()
+        
+        print("\nIngrese las temperaturas para los años 1961-2022 (62 valores):")
+        print("(Deje vacío para omitir un año)")
+        
+        series = {}
+        temperaturas_validas = []
+        años = list(range(1961, 2023))
+        
+        for año in años:
+            while True:
+                try:
+                    temp_input = input(f"Temperatura {año}: ").strip()
+                    if temp_input == "":
+                        series[str(año)] = None
+                        break
+                    else:
+                        temperatura = float(temp_input)
+                        series[str(año)] = temperatura
+                        temperaturas_validas.append(temperatura)
+                        break
+                except ValueError:
+                    print("Ingrese un número válido o deje vacío para omitir")
+        
+        if temperaturas_validas:
+            mean_change = sum(temperaturas_validas) / len(temperaturas_validas)
+            print(f"Media : {mean_change:.3f}°C (basada en {len(temperaturas_validas)} años)")
+        else:
+            mean_change = 0.0
+            print("No se ingresaron temperaturas válidas, media = 0.0")
+        
+        if self.series_store is None:
+            self.series_store = SeriesStore([str(año) for año in años])
+        fila = self.series_store.append(series)
+        serie = self.series_store.view(fila)
+
+        payload = {
+            "ISO3": iso3,
+            "Country": country,
+            "mean_change": mean_change,
+            "series": serie,
+            "derived": derived_view(serie)
+        }
+        
+        self.insert(mean_change, payload)
+        print(f"{country} ({iso3}) insertado.")
+        print(f"   - Media: {mean_change:.3f}°C")
+        print(f"   - Años con datos: {len(temperaturas_validas)}/{len(años)}")
@@ -0,0 +1,329 @@
+import heapq
+import multiprocessing as mp
+import os
+from bisect import bisect_right
+from fractions import Fraction
+from typing import Optional, Any, Dict, List, Tuple, Iterable, Iterator
+import numpy as np
+import pandas as pd
+from src.avl_tree import AVLTree
+from src.dataset import SeriesStore, SeriesView
+from src.ordered_map import OrderedMap, Entry, cached_query
+
+
+def _pack(payloads: List[Dict[str, Any]], campo: str) -> List[Dict[str, Any]]:
+    cols = next((p[campo].store.years for p in payloads if isinstance(p.get(campo), SeriesView)), None)
+    if cols is None:
+        return payloads
+    rows = []
+    for p in payloads:
+        s = p.get(campo) or {}
+        if isinstance(s, SeriesView) and s.store.years == cols:
+            rows.append(s.array)
+        else:
+            rows.append(np.array([np.nan if s.get(c) is None or pd.isna(s.get(c)) else float(s.get(c)) for c in cols]))
+    store = SeriesStore(cols)
+    store.values = np.vstack(rows)
+    store.size = len(rows)
+    for i, p in enumerate(payloads):
+        p[campo] = store.view(i)
+    return payloads
+
+
+def _portable(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Copia los payloads con sus series (y métricas derivadas) en bloques propios y
+    # compactos: así al serializarlos no viaja el SeriesStore completo al que apuntan.
+    out = [dict(p) for p in payloads]
+    for campo in ("series", "derived"):
+        out = _pack(out, campo)
+    return out
+
+
+def _export(nodes: List[Any]) -> List[Entry]:
+    datas = _portable([n.data for n in nodes])
+    return [Entry(n.key, d) for n, d in zip(nodes, datas)]
+
+
+def _dispatch(tree: OrderedMap, method: str, args: tuple) -> Any:
+    if method == "stats":
+        return tree._series_sum, tree._series_count
+    if method == "year_stats":
+        indice = tree.year_index(args[0])
+        return indice.total, len(indice)
+    if method in ("find_by_key", "find_nearest", "find_by_iso3"):
+        n = getattr(tree, method)(*args)
+        return _export([n])[0] if n is not None else None
+    if method == "pop":
+        n = tree.find_by_key(args[0])
+        if n is None:
+            return None
+        data = _export([n])[0].data
+        tree.delete(args[0])
+        return data
+    if method == "list_inorder":
+        return _export(list(tree.iter_inorder()))
+    if method == "list_reverse":
+        return _export(list(tree.iter_reverse()))
+    if method == "list_from":
+        return _export(list(tree.iter_from(*args)))
+    if method == "list_down_from":
+        return _export(list(tree.iter_down_from(*args)))
+    if method == "list_range":
+        return _export(list(tree.iter_range(*args)))
+    if method in ("top_k", "bottom_k"):
+        return _export(getattr(tree, method)(*args))
+    return getattr(tree, method)(*args)
+
+
+def _worker(conn, backend) -> None:
+    tree = backend()
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        method, args = msg
+        try:
+            conn.send((True, _dispatch(tree, method, args)))
+        except Exception as e:
+            conn.send((False, e))
+    conn.close()
+
+
+class ShardedTree(OrderedMap):
+    # Divide el espacio de claves (mean_change) en N rangos contiguos, cada uno en
+    # un árbol propio dentro de un proceso trabajador. Las operaciones puntuales van
+    # a un solo shard; las consultas de rango/umbral se reparten y se mezclan en orden.
+    def __init__(self, n_shards: Optional[int] = None, backend=AVLTree,
+                 boundaries: Optional[List[float]] = None):
+        super().__init__()
+        self.n_shards = max(1, n_shards or os.cpu_count() or 1)
+        self.boundaries: Optional[List[float]] = list(boundaries) if boundaries else None
+        self._conns = []
+        self._procs = []
+        for _ in range(self.n_shards):
+            parent, child = mp.Pipe()
+            proc = mp.Process(target=_worker, args=(child, backend), daemon=True)
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    def __enter__(self) -> "ShardedTree":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+        self._conns, self._procs = [], []
+
+    # ---- comunicación ----
+
+    def _call_many(self, calls: Dict[int, Tuple[str, tuple]]) -> Dict[int, Any]:
+        # Envía primero a todos los shards y luego recoge, para que trabajen en paralelo.
+        for i, msg in calls.items():
+            self._conns[i].send(msg)
+        res, error = {}, None
+        for i in calls:
+            ok, val = self._conns[i].recv()
+            if ok:
+                res[i] = val
+            elif error is None:
+                error = val
+        if error is not None:
+            raise error
+        return res
+
+    def _call(self, i: int, method: str, *args) -> Any:
+        return self._call_many({i: (method, args)})[i]
+
+    def _fan_out(self, method: str, *args, shards: Optional[Iterable[int]] = None) -> List[Any]:
+        idx = list(range(self.n_shards)) if shards is None else list(shards)
+        res = self._call_many({i: (method, args) for i in idx})
+        return [res[i] for i in idx]
+
+    def _shard_of(self, key: float) -> int:
+        return bisect_right(self.boundaries, key) if self.boundaries else 0
+
+    def _refresh_stats(self) -> None:
+        stats = self._fan_out("stats")
+        self._series_sum = sum((s for s, _ in stats), Fraction(0))
+        self._series_count = sum(c for _, c in stats)
+        self._year_indexes = {}
+        self._metric_indexes = {}
+        self._version += 1
+
+    # ---- primitivas ----
+
+    def _insert(self, key: float, payload: Dict[str, Any]) -> None:
+        self._call(self._shard_of(key), "insert", key, _portable([payload])[0])
+
+    def _delete(self, key: float) -> Optional[Dict[str, Any]]:
+        return self._call(self._shard_of(key), "pop", key)
+
+    def find_by_key(self, key: float) -> Optional[Entry]:
+        return self._call(self._shard_of(float(key)), "find_by_key", float(key))
+
+    def find_nearest(self, key: float) -> Optional[Entry]:
+        t = float(key)
+        cands = [e for e in self._fan_out("find_nearest", t) if e is not None]
+        return min(cands, key=lambda e: abs(e.key - t)) if cands else None
+
+    def find_by_iso3(self, iso3: str) -> Optional[Entry]:
+        return next((e for e in self._fan_out("find_by_iso3", iso3) if e is not None), None)
+
+    # Cada shard se materializa de a uno: memoria O(n / N) en el proceso principal.
+    def iter_inorder(self) -> Iterator[Entry]:
+        for i in range(self.n_shards):
+            yield from self._call(i, "list_inorder")
+
+    def iter_reverse(self) -> Iterator[Entry]:
+        for i in range(self.n_shards - 1, -1, -1):
+            yield from self._call(i, "list_reverse")
+
+    def iter_from(self, low: float, inclusive: bool = True) -> Iterator[Entry]:
+        for i in range(self._shard_of(low), self.n_shards):
+            yield from self._call(i, "list_from", low, inclusive)
+
+    def iter_down_from(self, high: float, inclusive: bool = True) -> Iterator[Entry]:
+        for i in range(self._shard_of(high), -1, -1):
+            yield from self._call(i, "list_down_from", high, inclusive)
+
+    def iter_range(self, low: float, high: float) -> Iterator[Entry]:
+        # Solo viajan las entradas dentro de [low, high], shard por shard
+        if low > high:
+            return
+        for i in range(self._shard_of(low), self._shard_of(high) + 1):
+            yield from self._call(i, "list_range", low, high)
+
+    def is_empty(self) -> bool:
+        return all(self._fan_out("is_empty"))
+
+    def clear(self) -> None:
+        super().clear()
+        self._fan_out("clear")
+
+    # ---- operaciones por lotes ----
+
+    def insert_batch(self, items: Iterable[Tuple[float, Dict[str, Any]]]) -> None:
+        items = [(float(k), p) for k, p in items]
+        if not items:
+            return
+        if self.boundaries is None:
+            # Sin límites todo fue al shard 0 (p. ej. inserciones sueltas previas): se
+            # reparten por cuantiles de las claves ya guardadas más las del lote.
+            previos = [(e.key, e.data) for e in self._call(0, "list_inorder")]
+            if previos:
+                self._call(0, "clear")
+                items = previos + items
+            keys = sorted(k for k, _ in items)
+            self.boundaries = [keys[len(keys) * i // self.n_shards] for i in range(1, self.n_shards)]
+        grupos: Dict[int, List[Tuple[float, Dict[str, Any]]]] = {}
+        for k, p in items:
+            grupos.setdefault(self._shard_of(k), []).append((k, p))
+        calls = {}
+        for i, grupo in grupos.items():
+            payloads = _portable([p for _, p in grupo])
+            calls[i] = ("insert_batch", ([(k, p) for (k, _), p in zip(grupo, payloads)],))
+        self._call_many(calls)
+        self._refresh_stats()
+
+    def difference(self, keys: Iterable[float]) -> int:
+        grupos: Dict[int, List[float]] = {}
+        for k in keys:
+            grupos.setdefault(self._shard_of(float(k)), []).append(float(k))
+        removed = sum(self._call_many({i: ("difference", (ks,)) for i, ks in grupos.items()}).values())
+        if removed:
+            self._refresh_stats()
+        return removed
+
+    def remove_range(self, low: float, high: float) -> int:
+        shards = range(self._shard_of(low), self._shard_of(high) + 1)
+        removed = sum(self._fan_out("remove_range", low, high, shards=shards))
+        if removed:
+            self._refresh_stats()
+        return removed
+
+    # ---- consultas repartidas ----
+
+    def top_k(self, n: int) -> List[Entry]:
+        return heapq.nlargest(max(0, n), (e for part in self._fan_out("top_k", n) for e in part), key=lambda e: e.key)
+
+    def bottom_k(self, n: int) -> List[Entry]:
+        return heapq.nsmallest(max(0, n), (e for part in self._fan_out("bottom_k", n) for e in part), key=lambda e: e.key)
+
+    @cached_query
+    def above_in_year(self, año: int, valor: float, inclusive: bool = False) -> List[Tuple[str, float]]:
+        return list(heapq.merge(*self._fan_out("above_in_year", año, valor, inclusive), key=lambda r: r[1]))
+
+    @cached_query
+    def below_in_year(self, año: int, valor: float, inclusive: bool = False) -> List[Tuple[str, float]]:
+        return list(heapq.merge(*self._fan_out("below_in_year", año, valor, inclusive), key=lambda r: r[1]))
+
+    @cached_query
+    def top_k_year(self, año: int, k: int) -> List[Tuple[str, float]]:
+        return heapq.nlargest(max(0, k), (r for part in self._fan_out("top_k_year", año, k) for r in part), key=lambda r: r[1])
+
+    @cached_query
+    def bottom_k_year(self, año: int, k: int) -> List[Tuple[str, float]]:
+        return heapq.nsmallest(max(0, k), (r for part in self._fan_out("bottom_k_year", año, k) for r in part), key=lambda r: r[1])
+
+    @cached_query
+    def above_metric(self, metrica: str, valor: float, inclusive: bool = False) -> List[Tuple[str, float]]:
+        return list(heapq.merge(*self._fan_out("above_metric", metrica, valor, inclusive), key=lambda r: r[1]))
+
+    @cached_query
+    def below_metric(self, metrica: str, valor: float, inclusive: bool = False) -> List[Tuple[str, float]]:
+        return list(heapq.merge(*self._fan_out("below_metric", metrica, valor, inclusive), key=lambda r: r[1]))
+
+    @cached_query
+    def top_k_metric(self, metrica: str, k: int) -> List[Tuple[str, float]]:
+        return heapq.nlargest(max(0, k), (r for part in self._fan_out("top_k_metric", metrica, k) for r in part), key=lambda r: r[1])
+
+    @cached_query
+    def bottom_k_metric(self, metrica: str, k: int) -> List[Tuple[str, float]]:
+        return heapq.nsmallest(max(0, k), (r for part in self._fan_out("bottom_k_metric", metrica, k) for r in part), key=lambda r: r[1])
+
+    @cached_query
+    def punto_4a(self, año: int) -> List[Tuple[str, float, float]]:
+        if self.is_empty():
+            return []
+
+        if año < 1961 or año > 2022:
+            raise ValueError(f"Año {año} fuera de rango (1961-2022)")
+
+        # cada shard devuelve su suma exacta (Fraction) y su cantidad: la media
+        # combinada se redondea una sola vez, igual que con un único árbol
+        stats = self._fan_out("year_stats", año)
+        count = sum(c for _, c in stats)
+        if not count:
+            return []
+
+        promedio_año = float(sum((s for s, _ in stats), Fraction(0)) / count)
+        return [(iso3, temp, promedio_año) for iso3, temp in self.above_in_year(año, promedio_año)]
+
+    @cached_query
+    def punto_4b(self, año: int) -> List[Tuple[str, float, float]]:
+        if self.is_empty():
+            return []
+
+        if año < 1961 or año > 2022:
+            raise ValueError(f"Año {año} fuera de rango (1961-2022)")
+
+        if self._series_count == 0:
+            return []
+
+        promedio_total = float(self._series_sum / self._series_count)
+        return [(iso3, temp, promedio_total) for iso3, temp in self.below_in_year(año, promedio_total)]
+
+    @cached_query
+    def punto_4c(self, valor_umbral: float) -> List[Tuple[str, float]]:
+        shards = range(self._shard_of(valor_umbral), self.n_shards)
+        return [r for part in self._fan_out("punto_4c", valor_umbral, shards=shards) for r in part]
@@ -0,0 +1,109 @@
+from typing import Optional, Any, Dict, List, Tuple, Iterable, Iterator
+import numpy as np
+from src.ordered_map import OrderedMap, Entry, next_key
+
+
+class SortedArrayMap(OrderedMap):
+    # Claves en un arreglo NumPy ordenado (búsquedas con searchsorted) y entradas
+    # en una lista paralela. Lecturas muy rápidas; cada edición desplaza O(n).
+    def __init__(self):
+        super().__init__()
+        self._keys = np.empty(0, dtype=np.float64)
+        self._entries: List[Entry] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _pos(self, key: float) -> Optional[int]:
+        i = int(np.searchsorted(self._keys, key, "left"))
+        return i if i < len(self._keys) and self._keys[i] == key else None
+
+    def _insert(self, key: float, payload: Dict[str, Any]) -> None:
+        while self._pos(key) is not None:
+            key = next_key(key)
+        i = int(np.searchsorted(self._keys, key, "left"))
+        self._keys = np.insert(self._keys, i, key)
+        self._entries.insert(i, Entry(key, payload))
+
+    def _delete(self, key: float) -> Optional[Dict[str, Any]]:
+        i = self._pos(key)
+        if i is None:
+            return None
+        self._keys = np.delete(self._keys, i)
+        return self._entries.pop(i).data
+
+    def find_by_key(self, key: float) -> Optional[Entry]:
+        i = self._pos(float(key))
+        return self._entries[i] if i is not None else None
+
+    def find_nearest(self, key: float) -> Optional[Entry]:
+        if not self._entries:
+            return None
+        t = float(key)
+        i = int(np.searchsorted(self._keys, t, "left"))
+        cands = [j for j in (i - 1, i) if 0 <= j < len(self._entries)]
+        return self._entries[min(cands, key=lambda j: abs(self._keys[j] - t))]
+
+    def iter_inorder(self) -> Iterator[Entry]:
+        return iter(self._entries)
+
+    def iter_reverse(self) -> Iterator[Entry]:
+        return reversed(self._entries)
+
+    def iter_from(self, low: float, inclusive: bool = True) -> Iterator[Entry]:
+        i = int(np.searchsorted(self._keys, low, "left" if inclusive else "right"))
+        for j in range(i, len(self._entries)):
+            yield self._entries[j]
+
+    def iter_down_from(self, high: float, inclusive: bool = True) -> Iterator[Entry]:
+        j = int(np.searchsorted(self._keys, high, "right" if inclusive else "left"))
+        for i in range(j - 1, -1, -1):
+            yield self._entries[i]
+
+    def is_empty(self) -> bool:
+        return not self._entries
+
+    def clear(self) -> None:
+        super().clear()
+        self._keys = np.empty(0, dtype=np.float64)
+        self._entries = []
+
+    def remove_range(self, low: float, high: float) -> int:
+        i = int(np.searchsorted(self._keys, low, "left"))
+        j = int(np.searchsorted(self._keys, high, "right"))
+        removed = self._entries[i:j]
+        self._keys = np.concatenate([self._keys[:i], self._keys[j:]])
+        del self._entries[i:j]
+        for e in removed:
+            self._unindex_payload(e.data)
+        return len(removed)
+
+    def difference(self, keys: Iterable[float]) -> int:
+        ks = np.fromiter((float(k) for k in keys), dtype=np.float64)
+        if not len(ks) or not self._entries:
+            return 0
+        mask = np.isin(self._keys, ks)
+        removed = [e for e, m in zip(self._entries, mask) if m]
+        self._keys = self._keys[~mask]
+        self._entries = [e for e, m in zip(self._entries, mask) if not m]
+        for e in removed:
+            self._unindex_payload(e.data)
+        return len(removed)
+
+    def insert_batch(self, items: Iterable[Tuple[float, Dict[str, Any]]]) -> None:
+        new = [Entry(k, p) for k, p in items]
+        if not new:
+            return
+        entries = self._entries + new
+        keys = np.concatenate([self._keys, np.array([e.key for e in new], dtype=np.float64)])
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        entries = [entries[i] for i in order]
+        if len(keys) > 1 and np.any(np.diff(keys) <= 0):
+            for i in range(1, len(keys)):
+                if keys[i] <= keys[i - 1]:
+                    keys[i] = next_key(float(keys[i - 1]))
+                    entries[i].key = float(keys[i])
+        self._keys, self._entries = keys, entries
+        for e in new:
+            self._index_payload(e.data)
@@ -0,0 +1,242 @@
+import os
+import random
+import shutil
+
+import pandas as pd
+import pytest
+
+from main import build_tree
+from src.avl_tree import AVLTree
+from src.btree import BTreeMap
+from src.ordered_map import next_key
+from src.sorted_array import SortedArrayMap
+
+BACKENDS = {
+    "avl": AVLTree,
+    "sorted": SortedArrayMap,
+    # t=2 fuerza divisiones, préstamos y fusiones con pocos elementos
+    "btree": lambda: BTreeMap(t=2),
+}
+
+
+def _payload(i: int) -> dict:
+    return {"ISO3": f"P{i:03d}", "series": {"2000": float(i % 7)}}
+
+
+def _check_avl(t: AVLTree) -> None:
+    def rec(n, lo, hi, parent):
+        if not n:
+            return 0
+        assert n.parent is parent
+        assert lo < n.key < hi
+        hl = rec(n.left, lo, n.key, n)
+        hr = rec(n.right, n.key, hi, n)
+        assert n.height == 1 + max(hl, hr)
+        assert abs(hl - hr) <= 1
+        return n.height
+    rec(t.root, float("-inf"), float("inf"), None)
+
+
+def _check_btree(t: BTreeMap) -> None:
+    depths = set()
+
+    def rec(n, depth, lo, hi):
+        assert n.keys == sorted(n.keys) and all(lo < k < hi for k in n.keys)
+        assert [e.key for e in n.entries] == n.keys
+        if n is not t.root:
+            assert t.t - 1 <= len(n.keys) <= 2 * t.t - 1
+        if n.leaf:
+            depths.add(depth)
+            return
+        assert len(n.children) == len(n.keys) + 1
+        bounds = [lo] + n.keys + [hi]
+        for i, c in enumerate(n.children):
+            rec(c, depth + 1, bounds[i], bounds[i + 1])
+    rec(t.root, 0, float("-inf"), float("inf"))
+    assert len(depths) <= 1
+
+
+def _check(t, model: dict) -> None:
+    if isinstance(t, AVLTree):
+        _check_avl(t)
+    if isinstance(t, BTreeMap):
+        _check_btree(t)
+    entries = [(e.key, e.data["ISO3"]) for e in t.iter_inorder()]
+    assert entries == sorted(model.items())
+    assert [(e.key, e.data["ISO3"]) for e in t.iter_reverse()] == entries[::-1]
+    assert len(t.year_index(2000)) == len(model)
+    assert t._series_count == len(model)
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+@pytest.mark.parametrize("seed", range(5))
+def test_random_operations_match_model(name, seed):
+    rnd = random.Random(seed)
+    t = BACKENDS[name]()
+    t.year_index(2000)
+    model = {}
+    nxt = 0
+
+    def add(k, p):
+        # las claves repetidas se corren (next_key) hasta quedar libres
+        while k in model:
+            k = next_key(k)
+        model[k] = p["ISO3"]
+
+    for _ in range(300):
+        op = rnd.random()
+        if op < 0.4:
+            k = rnd.randint(0, 60) / 10
+            p = _payload(nxt); nxt += 1
+            t.insert(k, p)
+            add(k, p)
+        elif op < 0.6 and model:
+            k = rnd.choice(list(model))
+            t.delete(k)
+            del model[k]
+        elif op < 0.7:
+            batch = [(rnd.randint(0, 60) / 10, _payload(nxt + i)) for i in range(rnd.randint(0, 15))]
+            nxt += len(batch)
+            esperados = set(model.values()) | {p["ISO3"] for _, p in batch}
+            t.insert_batch(batch)
+            # cada backend corre las claves repetidas en su propio orden; se toma la del
+            # árbol y se comprueba que no se perdió ni duplicó ningún payload
+            model = {e.key: e.data["ISO3"] for e in t.iter_inorder()}
+            assert sorted(model.values()) == sorted(esperados)
+        elif op < 0.8 and model:
+            ks = rnd.sample(list(model), min(len(model), rnd.randint(1, 8)))
+            assert t.difference(ks) == len(ks)
+            for k in ks:
+                del model[k]
+        elif op < 0.85:
+            lo = rnd.randint(0, 60) / 10
+            hi = lo + rnd.randint(0, 10) / 10
+            gone = [k for k in model if lo <= k <= hi]
+            assert t.remove_range(lo, hi) == len(gone)
+            for k in gone:
+                del model[k]
+        else:
+            v = rnd.randint(-5, 65) / 10
+            keys = sorted(model)
+            assert [e.key for e in t.iter_from(v)] == [k for k in keys if k >= v]
+            assert [e.key for e in t.iter_down_from(v, False)] == [k for k in reversed(keys) if k < v]
+            n = t.find_nearest(v)
+            if keys:
+                assert abs(n.key - v) == min(abs(k - v) for k in keys)
+            else:
+                assert n is None
+        _check(t, model)
+
+
+def test_insert_batch_never_duplicates_existing_keys():
+    for name, cls in BACKENDS.items():
+        t = cls()
+        t.insert_batch([(1.0, _payload(0)), (2.0, _payload(1))])
+        t.insert_batch([(1.0, _payload(2)), (1.0, _payload(3))])
+        keys = [e.key for e in t.iter_inorder()]
+        assert len(keys) == len(set(keys)) == 4, name
+        assert t.difference([1.0]) == 1
+        assert t.find_by_iso3("P002") is not None
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_avl_split_join_union(seed):
+    rnd = random.Random(seed)
+    t = AVLTree()
+    t.insert_batch((rnd.randint(0, 200) / 10, _payload(i)) for i in range(rnd.randint(0, 120)))
+    keys = [e.key for e in t.iter_inorder()]
+    pivot = rnd.randint(0, 200) / 10
+
+    left, right = t.split(pivot)
+    _check_avl(left); _check_avl(right)
+    assert [e.key for e in left.iter_inorder()] == [k for k in keys if k < pivot]
+    assert [e.key for e in right.iter_inorder()] == [k for k in keys if k >= pivot]
+    assert left._series_count + right._series_count == len(keys)
+
+    mid = pivot - 1e-6
+    while mid in keys:
+        mid -= 1e-6
+    left_keys = [e.key for e in left.iter_inorder()]
+    small, big = left.split(mid)
+    joined = AVLTree.join(small, mid, _payload(999), big)
+    _check_avl(joined)
+    assert [e.key for e in joined.iter_inorder()] == sorted(left_keys + [mid])
+
+    joined.union(right)
+    _check_avl(joined)
+    assert [e.key for e in joined.iter_inorder()] == sorted(keys + [mid])
+    assert joined._series_count == len(keys) + 1
+    assert right.is_empty()
+
+
+def test_cached_query_normalizes_arguments_and_returns_copies():
+    t = AVLTree()
+    t.insert_batch((i / 10, {"ISO3": f"P{i:03d}", "series": {"2000": i / 10}}) for i in range(20))
+    esperado = t.above_in_year(2000, 0.5, True)
+    assert t.above_in_year(2000, 0.5, inclusive=True) == esperado
+    assert t.above_in_year(2000, valor=0.5, inclusive=True) == esperado
+    assert t.above_in_year(2000, 0.5) == t.above_in_year(2000, 0.5, False) != esperado
+    assert len(t._query_cache) == 2
+
+    r = t.punto_4c(1.0)
+    r.clear()
+    assert t.punto_4c(1.0) != []
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_insert_batch_updates_metric_indexes(name):
+    t = BACKENDS[name]()
+    items = [(i / 10, {"ISO3": f"P{i:03d}", "series": {}, "derived": {"trend": (i * 7) % 11 / 100}})
+             for i in range(30)]
+    t.insert_batch(items[:20])
+    t.metric_index("trend")
+    t.year_index(2000)
+    t.insert_batch(items[20:])
+    assert len(t.metric_index("trend")) == 30
+    esperado = sorted(((p["ISO3"], p["derived"]["trend"]) for _, p in items), key=lambda r: r[1])
+    assert sorted(v for _, v in t.top_k_metric("trend", 5)) == sorted(v for _, v in esperado[-5:])
+
+
+CSV = os.path.join(os.path.dirname(__file__), "..", "dataset_climate_change.csv")
+
+
+def test_year_and_global_means_do_not_depend_on_edit_history(tmp_path):
+    csv_path = str(tmp_path / "datos.csv")
+    shutil.copy(CSV, csv_path)
+    t = build_tree(csv_path, "avl")[0]
+    años = (1961, 1990, 2000, 2022)
+    for año in años:
+        t.punto_4a(año)
+
+    rnd = random.Random(0)
+    for _ in range(3):
+        sacados = rnd.sample([(e.key, e.data) for e in t.iter_inorder()], 40)
+        for k, _ in sacados:
+            t.delete(k)
+        t.insert_batch(sacados)
+
+    df = pd.read_csv(csv_path)
+    df.loc[df["ISO3"] == "ARG", "F2000"] += 0.25
+    df[df["ISO3"] != "BRA"].to_csv(csv_path, index=False)
+    t.reload(csv_path)
+    df.to_csv(csv_path, index=False)
+    t.reload(csv_path)
+
+    fresco = build_tree(csv_path, "avl")[0]
+    assert t._series_sum == fresco._series_sum
+    # los empates de temperatura pueden quedar en otro orden; importa el conjunto y la media
+    for año in años:
+        assert sorted(t.punto_4a(año)) == sorted(fresco.punto_4a(año))
+        assert sorted(t.punto_4b(año)) == sorted(fresco.punto_4b(año))
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_colliding_keys_beyond_1e9_resolution(name):
+    # con |clave| >= 2**24 sumar 1e-9 no cambia el float: hay que avanzar igual
+    t = BACKENDS[name]()
+    for i in range(3):
+        t.insert(2e7, _payload(i))
+    t.insert_batch([(2e7, _payload(3)), (2e7, _payload(4)), (2.0 ** 60, _payload(5)), (2.0 ** 60, _payload(6))])
+    keys = [e.key for e in t.iter_inorder()]
+    assert len(keys) == len(set(keys)) == 7
+    assert keys == sorted(keys)
@@ -0,0 +1,44 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from main import build_tree
+
+CSV = os.path.join(os.path.dirname(__file__), "..", "dataset_climate_change.csv")
+
+
+def _contenido(tree):
+    return sorted((e.data["ISO3"], e.key) for e in tree.iter_inorder())
+
+
+@pytest.mark.parametrize("backend", ["avl", "sorted", "btree"])
+def test_reload_applies_only_the_row_diff(tmp_path, backend):
+    csv_path = str(tmp_path / "datos.csv")
+    shutil.copy(CSV, csv_path)
+    tree = build_tree(csv_path, backend)[0]
+    tree.punto_4a(2000)
+
+    df = pd.read_csv(csv_path)
+    df.loc[df["ISO3"] == "ARG", "F2000"] += 0.25
+    nueva = df[df["ISO3"] == "DZA"].copy()
+    nueva["ObjectId"] = df["ObjectId"].max() + 1
+    nueva["ISO3"] = "ZZZ"
+    nueva["Country"] = "Prueba"
+    pd.concat([df[df["ISO3"] != "BRA"], nueva]).to_csv(csv_path, index=False)
+
+    _, _, _, cambios = tree.reload(csv_path)
+    assert cambios == {"insertados": 1, "eliminados": 1, "modificados": 1, "sin_cambios": len(df) - 2}
+
+    fresco = build_tree(csv_path, backend)[0]
+    assert _contenido(tree) == _contenido(fresco)
+    assert tree.find_by_iso3("BRA") is None
+    assert tree.find_by_iso3("ZZZ").data["series"]["2000"] == fresco.find_by_iso3("ZZZ").data["series"]["2000"]
+    for año in (1961, 2000, 2022):
+        assert sorted(tree.punto_4a(año)) == sorted(fresco.punto_4a(año))
+        assert sorted(tree.punto_4b(año)) == sorted(fresco.punto_4b(año))
+
+    _, _, _, cambios = tree.reload(csv_path)
+    assert cambios["insertados"] == cambios["eliminados"] == cambios["modificados"] == 0
+    assert _contenido(tree) == _contenido(fresco)
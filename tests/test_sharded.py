@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from src.avl_tree import AVLTree
+from src.dataset import load_dataset, build_series_store, derive_metrics, to_payload
+from src.sharded import ShardedTree
+
+CSV = os.path.join(os.path.dirname(__file__), "..", "dataset_climate_change.csv")
+
+
+@pytest.fixture(scope="module")
+def filas():
+    df, _, _ = load_dataset(CSV)
+    store = build_series_store(df)
+    derived = derive_metrics(store)
+    return [(round(p["mean_change"], 6), p) for p in (to_payload(r, store, derived) for _, r in df.iterrows())]
+
+
+@pytest.fixture(params=[2, 3])
+def par(request, filas):
+    # Mismos datos en un AVLTree y en un ShardedTree; la primera inserción suelta
+    # llega antes del primer lote, así que los límites salen del reparto posterior.
+    ref, t = AVLTree(), ShardedTree(request.param)
+    try:
+        for k, p in filas[:3]:
+            ref.insert(k, p)
+            t.insert(k, p)
+        ref.insert_batch(filas[3:])
+        t.insert_batch(filas[3:])
+        yield ref, t
+    finally:
+        t.close()
+
+
+def _contenido(tree):
+    return [(e.key, e.data["ISO3"]) for e in tree.iter_inorder()]
+
+
+def test_first_batch_spreads_earlier_inserts_over_every_shard(par):
+    ref, t = par
+    assert t.boundaries is not None and len(t.boundaries) == t.n_shards - 1
+    assert all(t._fan_out("list_inorder"))
+    assert _contenido(t) == _contenido(ref)
+    assert t._series_sum == ref._series_sum and t._series_count == ref._series_count
+
+
+def test_point_operations_route_to_the_right_shard(par):
+    ref, t = par
+    claves = [e.key for e in ref.iter_inorder()]
+    for k in claves[::17]:
+        assert t.find_by_key(k).data["ISO3"] == ref.find_by_key(k).data["ISO3"]
+        ref.delete(k)
+        t.delete(k)
+    nuevo = {"ISO3": "ZZZ", "Country": "Prueba", "mean_change": 0.123, "series": {"2000": 0.5}}
+    ref.insert(0.123, nuevo)
+    t.insert(0.123, nuevo)
+    assert _contenido(t) == _contenido(ref)
+    assert t.find_by_iso3("ZZZ").key == 0.123
+    assert t.find_by_key_approx(0.1230004).data["ISO3"] == "ZZZ"
+    assert t.find_by_key_rounded(0.123).data["ISO3"] == "ZZZ"
+
+
+def test_queries_match_a_single_tree(par):
+    ref, t = par
+    for año in (1961, 1990, 2000, 2022):
+        assert sorted(t.punto_4a(año)) == sorted(ref.punto_4a(año))
+        assert sorted(t.punto_4b(año)) == sorted(ref.punto_4b(año))
+    for umbral in (-1.0, 0.5, 1.2, 5.0):
+        assert t.punto_4c(umbral) == ref.punto_4c(umbral)
+    assert t.top_k_metric("trend", 5) == ref.top_k_metric("trend", 5)
+    assert t.bottom_k_metric("trend", 5) == ref.bottom_k_metric("trend", 5)
+    assert [e.key for e in t.iter_range(0.4, 0.6)] == [e.key for e in ref.iter_range(0.4, 0.6)]
+
+
+def test_remove_range_matches_a_single_tree(par):
+    ref, t = par
+    assert t.remove_range(0.5, 1.0) == ref.remove_range(0.5, 1.0) > 0
+    assert _contenido(t) == _contenido(ref)
+    assert sorted(t.punto_4a(2000)) == sorted(ref.punto_4a(2000))
+
+
+def test_empty_tree_returns_no_results_before_validating_the_year():
+    with ShardedTree(2) as t:
+        assert t.punto_4a(1900) == []
+        assert t.punto_4b(1900) == []